@@ -0,0 +1,39 @@
+# 页面静态化的异步任务
+from django_redis import get_redis_connection
+
+from celery_tasks.main import celery_app
+from contents import constants
+from contents.crons import generate_static_index_html as generate_index_html
+from goods.static_html import generate_static_sku_detail_html as generate_sku_detail_html
+from goods.static_html import generate_static_sku_detail_htmls as generate_sku_detail_htmls
+
+
+@celery_app.task(name='generate_static_index_html')
+def generate_static_index_html():
+    """
+    异步生成静态的主页html文件
+    先清除待生成标记再渲染：渲染期间发生的修改会重新设置标记并再安排一次生成，不会丢失
+    """
+    redis_conn = get_redis_connection('default')
+    redis_conn.delete(constants.STATIC_INDEX_HTML_PENDING_KEY)
+
+    generate_index_html()
+
+
+@celery_app.task(name='generate_static_sku_detail_html')
+def generate_static_sku_detail_html(sku_id):
+    """
+    异步生成sku的静态详情页，sku已下架或删除时删除其详情页
+    """
+    generate_sku_detail_html(sku_id)
+
+
+@celery_app.task(name='generate_static_sku_detail_htmls')
+def generate_static_sku_detail_htmls(force=False):
+    """
+    异步批量生成上架sku的静态详情页，默认增量生成，和 python manage.py generate_detail_html 相同
+    celery的工作进程不能再创建进程池，在当前工作进程中逐个生成
+    :param force: 是否忽略增量判断全部重新生成
+    :return: 生成的数量
+    """
+    return generate_sku_detail_htmls(force=force, processes=1)
@@ -0,0 +1,61 @@
+# 图片衍生版本（缩略图、webp）的异步任务
+from celery_tasks.main import celery_app
+from contents.models import Content
+from contents.utils import invalidate_slot_contents
+from goods.images import get_file_id, generate_image_variants
+from goods.models import SKU, SKUImage
+from goods.static_html import generate_static_sku_detail_html
+from goods import constants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+def _generate_variants(file_ids, names):
+    """
+    生成多张原图的衍生版本，一张图片失败不影响其他图片
+    :return: 新生成的数量
+    """
+    count = 0
+    for file_id in file_ids:
+        try:
+            count += generate_image_variants(file_id, names)
+        except Exception as e:
+            logger.error('generate variants of image %s failed: %s' % (file_id, e))
+    return count
+
+
+@celery_app.task(name='generate_sku_image_variants')
+def generate_sku_image_variants(sku_id):
+    """
+    生成sku默认图片和sku图片的衍生版本，有新生成的版本时重新生成sku的静态详情页
+    """
+    sku = SKU.objects.filter(id=sku_id).first()
+    if sku is None:
+        return
+
+    file_ids = {get_file_id(sku.default_image_url)}
+    file_ids.update(get_file_id(image.image) for image in SKUImage.objects.filter(sku_id=sku_id))
+    file_ids.discard('')
+
+    if _generate_variants(file_ids, constants.SKU_IMAGE_VARIANTS):
+        generate_static_sku_detail_html(sku_id)
+
+
+@celery_app.task(name='generate_content_image_variants')
+def generate_content_image_variants(content_id):
+    """
+    生成广告图片的衍生版本，有新生成的版本时使广告缓存失效并重新生成主页
+    """
+    # contents.signals导入了异步任务，在这里导入避免循环导入
+    from contents.signals import schedule_static_index_html
+
+    content = Content.objects.select_related('category').filter(id=content_id).first()
+    if content is None:
+        return
+
+    if _generate_variants([get_file_id(content.image)], constants.CONTENT_IMAGE_VARIANTS):
+        invalidate_slot_contents(content.category.key)
+        schedule_static_index_html()
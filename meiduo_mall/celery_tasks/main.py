@@ -14,4 +14,5 @@ celery_app = Celery('meiduo_mall')
 celery_app.config_from_object('celery_tasks.config')
 
 # 指定异步任务
-celery_app.autodiscover_tasks(['celery_tasks.sms', 'celery_tasks.email'])
+celery_app.autodiscover_tasks(['celery_tasks.sms', 'celery_tasks.email', 'celery_tasks.html', 'celery_tasks.search',
+                               'celery_tasks.images'])
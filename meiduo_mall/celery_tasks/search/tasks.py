@@ -0,0 +1,19 @@
+# sku全文检索索引的异步任务
+# 索引保存在本机文件中，执行该任务的worker需要和提供搜索接口的web服务部署在同一台机器上
+import sqlite3
+
+from celery_tasks.main import celery_app
+from goods.search import update_sku_index
+from goods import constants
+
+
+@celery_app.task(name='update_sku_search_index', bind=True, max_retries=constants.SEARCH_INDEX_UPDATE_MAX_RETRIES)
+def update_sku_search_index(self, sku_id):
+    """
+    增量更新sku的全文检索索引
+    全量重建期间索引的写锁被长时间占用，等待超时后稍后重试
+    """
+    try:
+        update_sku_index(sku_id)
+    except sqlite3.OperationalError as e:
+        raise self.retry(exc=e, countdown=constants.SEARCH_INDEX_UPDATE_RETRY_DELAY)
@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class AreasConfig(AppConfig):
     name = 'areas'
+
+    def ready(self):
+        # 注册信号：省市区数据变化时重新加载进程内的省市区树
+        from . import signals
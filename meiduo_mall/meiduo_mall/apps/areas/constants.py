@@ -0,0 +1,8 @@
+# 省市区数据版本的redis键，省市区数据变化时自增，各进程据此重新加载省市区树
+AREA_VERSION_KEY = 'area_version'
+
+# 进程内省市区树检查版本的间隔，单位：秒
+AREA_TREE_CHECK_INTERVAL = 30
+
+# 省市区接口的浏览器缓存时间，单位：秒，过期后使用ETag验证
+AREA_CACHE_MAX_AGE = 60 * 60 * 24
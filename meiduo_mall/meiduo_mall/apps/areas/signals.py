@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Area
+from .utils import invalidate_area_tree
+
+
+@receiver([post_save, post_delete], sender=Area)
+def on_area_changed(sender, **kwargs):
+    """
+    省市区数据变化后，在事务提交后使各进程的省市区树失效
+    使用sql批量导入省市区数据后需要手动增加redis中的area_version
+    """
+    transaction.on_commit(invalidate_area_tree)
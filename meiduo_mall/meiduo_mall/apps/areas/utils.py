@@ -0,0 +1,116 @@
+from collections import namedtuple
+from io import BytesIO
+from types import MappingProxyType
+from django_redis import get_redis_connection
+from redis import RedisError
+import gzip
+import hashlib
+import json
+import threading
+import time
+
+from .models import Area
+from . import constants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+# 省市区树：所有接口数据都是预先编码好的json bytes
+# etag: 省市区数据的哈希；last_modified: 加载的时间戳；provinces: 省级数据json；details: {area_id: 该行政区及其下级的json}
+# full: 完整三级数据的紧凑json，[[省id, 省名, [[市id, 市名, [[区id, 区名], ...]], ...]], ...]；full_gzip: full的gzip压缩
+AreaTree = namedtuple('AreaTree', ['etag', 'last_modified', 'provinces', 'details', 'full', 'full_gzip'])
+
+# 进程内缓存的省市区树
+# version: 加载时redis中的省市区版本；checked_at: 上次检查版本的时间；tree: AreaTree
+_area_cache = {'version': None, 'checked_at': 0, 'tree': None}
+_area_lock = threading.Lock()
+
+
+def _dumps(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode()
+
+
+def _gzip(data):
+    """
+    gzip压缩，mtime固定为0，相同的数据压缩结果相同
+    """
+    buffer = BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=9, mtime=0) as gzip_file:
+        gzip_file.write(data)
+    return buffer.getvalue()
+
+
+def build_area_tree():
+    """
+    一次查询加载全部省市区，预先编码好省级列表和每个行政区详情的json
+    """
+    rows = list(Area.objects.order_by('id').values_list('id', 'name', 'parent_id'))
+
+    subs = {}
+    for area_id, name, parent_id in rows:
+        subs.setdefault(parent_id, []).append({'id': area_id, 'name': name})
+
+    details = {}
+    for area_id, name, parent_id in rows:
+        details[area_id] = _dumps({'id': area_id, 'name': name, 'subs': subs.get(area_id, [])})
+
+    # 完整三级数据：每个行政区编码为[id, 名称]，有下级时再加上下级列表，不重复键名
+    def compact(area_id):
+        items = []
+        for area in subs.get(area_id, []):
+            if area['id'] in subs:
+                items.append([area['id'], area['name'], compact(area['id'])])
+            else:
+                items.append([area['id'], area['name']])
+        return items
+
+    full = _dumps(compact(None))
+
+    etag = '"%s"' % hashlib.md5(_dumps(rows)).hexdigest()
+    return AreaTree(etag, int(time.time()), _dumps(subs.get(None, [])), MappingProxyType(details), full, _gzip(full))
+
+
+def get_area_tree():
+    """
+    获取进程内缓存的省市区树
+    每隔AREA_TREE_CHECK_INTERVAL秒检查一次redis中的省市区版本，版本变化时才重新加载，
+    其余时间直接读取内存，不访问数据库和redis
+    """
+    now = time.time()
+    if _area_cache['tree'] is not None and now - _area_cache['checked_at'] < constants.AREA_TREE_CHECK_INTERVAL:
+        return _area_cache['tree']
+
+    with _area_lock:
+        # 等待锁期间其他线程可能已经完成检查
+        if _area_cache['tree'] is not None and now - _area_cache['checked_at'] < constants.AREA_TREE_CHECK_INTERVAL:
+            return _area_cache['tree']
+
+        try:
+            redis_conn = get_redis_connection('default')
+            version = redis_conn.get(constants.AREA_VERSION_KEY)
+        except RedisError as e:
+            # redis不可用时沿用已加载的省市区树
+            logger.error(e)
+            version = _area_cache['version']
+
+        if _area_cache['tree'] is None or version != _area_cache['version']:
+            _area_cache['tree'] = build_area_tree()
+            _area_cache['version'] = version
+
+        _area_cache['checked_at'] = time.time()
+        return _area_cache['tree']
+
+
+def invalidate_area_tree():
+    """
+    省市区数据变化后增加版本，所有进程在下次检查时重新加载省市区树
+    """
+    _area_cache['checked_at'] = 0
+    try:
+        redis_conn = get_redis_connection('default')
+        redis_conn.incr(constants.AREA_VERSION_KEY)
+    except RedisError as e:
+        logger.error(e)
@@ -1,39 +1,110 @@
 from django.shortcuts import render
-from rest_framework.viewsets import ReadOnlyModelViewSet
-from rest_framework_extensions.cache.mixins import CacheResponseMixin
+from django.http import HttpResponse, HttpResponseNotModified, Http404
+from django.utils.http import http_date, parse_etags, parse_http_date_safe
+from rest_framework.viewsets import ViewSet
+from rest_framework.decorators import action
 
-from .models import Area
-from . import serializers
+from .utils import get_area_tree
+from . import constants
 # Create your views here.
 
 
-class AreasViewSet(CacheResponseMixin, ReadOnlyModelViewSet):
+def is_not_modified(request, tree, etag=None):
+    """
+    判断客户端缓存的数据是否仍然有效
+    有If-None-Match时只比较ETag，否则比较If-Modified-Since
+    """
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = parse_etags(if_none_match)
+        return '*' in etags or (etag or tree.etag) in etags
+
+    if_modified_since = parse_http_date_safe(request.META.get('HTTP_IF_MODIFIED_SINCE', ''))
+    return if_modified_since is not None and tree.last_modified <= if_modified_since
+
+
+def accepts_gzip(request):
+    """
+    客户端是否接受gzip压缩的响应
+    """
+    for coding in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, param = coding.partition(';')
+        if name.strip().lower() != 'gzip':
+            continue
+        # gzip;q=0表示不接受
+        param = param.replace(' ', '')
+        if param.startswith('q='):
+            try:
+                return float(param[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def set_cache_headers(response, tree, etag=None):
+    """
+    设置缓存相关的响应头：ETag是省市区数据的哈希，所有省市区接口共用
+    """
+    response['ETag'] = etag or tree.etag
+    response['Last-Modified'] = http_date(tree.last_modified)
+    response['Cache-Control'] = 'public, max-age=%d' % constants.AREA_CACHE_MAX_AGE
+    return response
+
+
+class AreasViewSet(ViewSet):
     """省市区三级联动数据
     list:
     获取省级数据
-    
+
     retrieve:
     获取城市和区县数据
+
+    tree:
+    获取完整的省市区三级数据
+
+    数据来自进程内缓存的省市区树，直接返回预先编码好的json，不查询数据库和redis；
+    客户端缓存的数据没有变化时直接返回304
     """
+    # 公开数据，不需要认证，避免携带token的请求解析token、查询用户
+    authentication_classes = []
+    permission_classes = []
 
-    # 禁用列表数据的分页
-    pagination_class = None
+    def list(self, request):
+        tree = get_area_tree()
+        if is_not_modified(request, tree):
+            return set_cache_headers(HttpResponseNotModified(), tree)
 
-    # 指定查询集
-    # queryset = Area.objects.all()
-    def get_queryset(self):
-        if self.action == 'list':
-            # 省级数据
-            return Area.objects.filter(parent=None)
-        else:
-            return Area.objects.all()
+        return set_cache_headers(HttpResponse(tree.provinces, content_type='application/json'), tree)
 
-    # 指定序列化器
-    def get_serializer_class(self):
-        if self.action == 'list':
-            # 省级数据
-            return serializers.AreasSerializer
-        else:
-            return serializers.SubsAreasSerializer
+    def retrieve(self, request, pk=None):
+        tree = get_area_tree()
+        if is_not_modified(request, tree):
+            return set_cache_headers(HttpResponseNotModified(), tree)
+
+        try:
+            content = tree.details[int(pk)]
+        except (KeyError, ValueError):
+            raise Http404
+        return set_cache_headers(HttpResponse(content, content_type='application/json'), tree)
 
+    # GET /areas/tree/
+    @action(methods=['get'], detail=False)
+    def tree(self, request):
+        """
+        完整的省市区三级数据，地址表单一次加载
+        客户端接受gzip时直接返回预先压缩好的数据，压缩和未压缩的数据使用不同的ETag
+        """
+        tree = get_area_tree()
+        use_gzip = accepts_gzip(request)
+        etag = tree.etag[:-1] + '-gzip"' if use_gzip else tree.etag
+
+        if is_not_modified(request, tree, etag):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(tree.full_gzip if use_gzip else tree.full, content_type='application/json')
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
 
+        response['Vary'] = 'Accept-Encoding'
+        return set_cache_headers(response, tree, etag)
@@ -0,0 +1,14 @@
+# 登录用户购物车商品数量的redis键，hash：sku_id -> count
+CART_KEY = 'cart_%s'
+
+# 登录用户购物车勾选状态的redis键，set：勾选的sku_id
+CART_SELECTED_KEY = 'cart_selected_%s'
+
+# 未登录用户购物车的cookie名
+CART_COOKIE_NAME = 'cart'
+
+# 未登录用户购物车cookie的签名盐值
+CART_COOKIE_SALT = 'carts.cookie'
+
+# 未登录用户购物车cookie的有效期，单位：秒
+CART_COOKIE_EXPIRES = 60 * 60 * 24 * 365
@@ -0,0 +1,50 @@
+from rest_framework import serializers
+
+from goods.models import SKU
+
+
+class CartSerializer(serializers.Serializer):
+    """
+    购物车添加、修改数据序列化器
+    """
+    sku_id = serializers.IntegerField(label='sku id', min_value=1)
+    count = serializers.IntegerField(label='数量', min_value=1)
+    selected = serializers.BooleanField(label='是否勾选', default=True)
+
+    def validate(self, data):
+        try:
+            sku = SKU.objects.get(id=data['sku_id'], is_launched=True)
+        except SKU.DoesNotExist:
+            raise serializers.ValidationError('商品不存在')
+
+        if data['count'] > sku.stock:
+            raise serializers.ValidationError('商品库存不足')
+
+        return data
+
+
+class CartDeleteSerializer(serializers.Serializer):
+    """
+    删除购物车数据序列化器
+    删除不需要查询数据库，不存在的sku删除时没有任何效果
+    """
+    sku_id = serializers.IntegerField(label='sku id', min_value=1)
+
+
+class CartSelectAllSerializer(serializers.Serializer):
+    """
+    购物车全选
+    """
+    selected = serializers.BooleanField(label='全选')
+
+
+class CartSKUSerializer(serializers.ModelSerializer):
+    """
+    购物车商品数据序列化器
+    """
+    count = serializers.IntegerField(label='数量')
+    selected = serializers.BooleanField(label='是否勾选')
+
+    class Meta:
+        model = SKU
+        fields = ('id', 'count', 'name', 'default_image_url', 'price', 'selected')
@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from django.core import signing
+from django_redis import get_redis_connection
+from redis import RedisError
+
+from . import constants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+def get_cookie_cart(request):
+    """
+    读取未登录用户的购物车cookie
+    cookie中保存的是签名并压缩过的列表[[sku_id, count, selected], ...]，selected为1或0
+    :return: OrderedDict{sku_id: {'count': , 'selected': }}，cookie不存在或被篡改时返回空字典
+    """
+    cart = OrderedDict()
+    cookie = request.COOKIES.get(constants.CART_COOKIE_NAME)
+    if not cookie:
+        return cart
+
+    try:
+        items = signing.loads(cookie, salt=constants.CART_COOKIE_SALT, max_age=constants.CART_COOKIE_EXPIRES)
+        for sku_id, count, selected in items:
+            cart[int(sku_id)] = {'count': int(count), 'selected': bool(selected)}
+    except (signing.BadSignature, TypeError, ValueError):
+        return OrderedDict()
+
+    return cart
+
+
+def set_cookie_cart(response, cart):
+    """
+    把未登录用户的购物车写入cookie，购物车为空时删除cookie
+    """
+    if not cart:
+        response.delete_cookie(constants.CART_COOKIE_NAME)
+        return
+
+    items = [[sku_id, item['count'], int(item['selected'])] for sku_id, item in cart.items()]
+    cookie = signing.dumps(items, salt=constants.CART_COOKIE_SALT, compress=True)
+    response.set_cookie(constants.CART_COOKIE_NAME, cookie, max_age=constants.CART_COOKIE_EXPIRES, httponly=True)
+
+
+def get_redis_cart(user_id):
+    """
+    读取登录用户的购物车：商品数量和勾选状态在一个管道中读取
+    :return: OrderedDict{sku_id: {'count': , 'selected': }}
+    """
+    redis_conn = get_redis_connection('cart')
+    pl = redis_conn.pipeline()
+    pl.hgetall(constants.CART_KEY % user_id)
+    pl.smembers(constants.CART_SELECTED_KEY % user_id)
+    redis_cart, redis_selected = pl.execute()
+
+    cart = OrderedDict()
+    for sku_id, count in redis_cart.items():
+        cart[int(sku_id)] = {'count': int(count), 'selected': sku_id in redis_selected}
+    return cart
+
+
+def merge_cart_cookie_to_redis(request, user_id, response):
+    """
+    登录时把cookie中的购物车合并到redis，一次管道写入
+    同一个sku以cookie中的数量和勾选状态为准
+    合并成功后删除cookie；redis不可用时保留cookie，下次登录再合并
+    """
+    cart = get_cookie_cart(request)
+    if not cart:
+        return response
+
+    counts = {sku_id: item['count'] for sku_id, item in cart.items()}
+    selected = [sku_id for sku_id, item in cart.items() if item['selected']]
+    unselected = [sku_id for sku_id, item in cart.items() if not item['selected']]
+
+    try:
+        redis_conn = get_redis_connection('cart')
+        pl = redis_conn.pipeline()
+        pl.hmset(constants.CART_KEY % user_id, counts)
+        if selected:
+            pl.sadd(constants.CART_SELECTED_KEY % user_id, *selected)
+        if unselected:
+            pl.srem(constants.CART_SELECTED_KEY % user_id, *unselected)
+        pl.execute()
+    except RedisError as e:
+        logger.error(e)
+        return response
+
+    response.delete_cookie(constants.CART_COOKIE_NAME)
+    return response
@@ -0,0 +1,184 @@
+from django_redis import get_redis_connection
+from rest_framework.views import APIView
+from rest_framework.generics import GenericAPIView
+from rest_framework.response import Response
+from rest_framework import status
+
+from goods.models import SKU
+from .utils import get_cookie_cart, set_cookie_cart, get_redis_cart
+from . import serializers
+from . import constants
+# Create your views here.
+
+
+def get_login_user(request):
+    """
+    获取登录用户，未登录或token无效时返回None
+    购物车视图允许未登录访问，认证失败不能直接返回401
+    """
+    try:
+        user = request.user
+    except Exception:
+        return None
+
+    if user is not None and user.is_authenticated:
+        return user
+    return None
+
+
+class CartAuthenticationMixin(object):
+    """
+    延后认证：在视图中访问request.user时才进行认证
+    """
+    def perform_authentication(self, request):
+        pass
+
+
+# url(r'^cart/$', views.CartView.as_view()),
+class CartView(CartAuthenticationMixin, GenericAPIView):
+    """
+    购物车
+    登录用户的购物车保存在redis，每次修改在一个管道中完成；未登录用户的购物车保存在签名的cookie中
+    """
+    serializer_class = serializers.CartSerializer
+
+    def get(self, request):
+        """
+        查询购物车，所有sku在一次查询中取出
+        """
+        user = get_login_user(request)
+        if user is not None:
+            cart = get_redis_cart(user.id)
+        else:
+            cart = get_cookie_cart(request)
+
+        skus = SKU.objects.in_bulk(list(cart))
+        sku_list = []
+        for sku_id, item in cart.items():
+            sku = skus.get(sku_id)
+            if sku is None:
+                continue
+            sku.count = item['count']
+            sku.selected = item['selected']
+            sku_list.append(sku)
+
+        serializer = serializers.CartSKUSerializer(sku_list, many=True)
+        return Response(serializer.data)
+
+    def post(self, request):
+        """
+        添加购物车，已在购物车中的sku累加数量
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sku_id = serializer.validated_data['sku_id']
+        count = serializer.validated_data['count']
+        selected = serializer.validated_data['selected']
+
+        user = get_login_user(request)
+        if user is not None:
+            redis_conn = get_redis_connection('cart')
+            pl = redis_conn.pipeline()
+            pl.hincrby(constants.CART_KEY % user.id, sku_id, count)
+            if selected:
+                pl.sadd(constants.CART_SELECTED_KEY % user.id, sku_id)
+            else:
+                pl.srem(constants.CART_SELECTED_KEY % user.id, sku_id)
+            pl.execute()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        cart = get_cookie_cart(request)
+        if sku_id in cart:
+            count += cart[sku_id]['count']
+        cart[sku_id] = {'count': count, 'selected': selected}
+
+        response = Response(serializer.data, status=status.HTTP_201_CREATED)
+        set_cookie_cart(response, cart)
+        return response
+
+    def put(self, request):
+        """
+        修改购物车，数量和勾选状态以请求为准
+        """
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sku_id = serializer.validated_data['sku_id']
+        count = serializer.validated_data['count']
+        selected = serializer.validated_data['selected']
+
+        user = get_login_user(request)
+        if user is not None:
+            redis_conn = get_redis_connection('cart')
+            pl = redis_conn.pipeline()
+            pl.hset(constants.CART_KEY % user.id, sku_id, count)
+            if selected:
+                pl.sadd(constants.CART_SELECTED_KEY % user.id, sku_id)
+            else:
+                pl.srem(constants.CART_SELECTED_KEY % user.id, sku_id)
+            pl.execute()
+            return Response(serializer.data)
+
+        cart = get_cookie_cart(request)
+        cart[sku_id] = {'count': count, 'selected': selected}
+
+        response = Response(serializer.data)
+        set_cookie_cart(response, cart)
+        return response
+
+    def delete(self, request):
+        """
+        删除购物车中的sku
+        """
+        serializer = serializers.CartDeleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        sku_id = serializer.validated_data['sku_id']
+
+        user = get_login_user(request)
+        if user is not None:
+            redis_conn = get_redis_connection('cart')
+            pl = redis_conn.pipeline()
+            pl.hdel(constants.CART_KEY % user.id, sku_id)
+            pl.srem(constants.CART_SELECTED_KEY % user.id, sku_id)
+            pl.execute()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        cart = get_cookie_cart(request)
+        cart.pop(sku_id, None)
+
+        response = Response(status=status.HTTP_204_NO_CONTENT)
+        set_cookie_cart(response, cart)
+        return response
+
+
+# url(r'^cart/selection/$', views.CartSelectAllView.as_view()),
+class CartSelectAllView(CartAuthenticationMixin, APIView):
+    """
+    购物车全选、全不选
+    """
+    def put(self, request):
+        serializer = serializers.CartSelectAllSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        selected = serializer.validated_data['selected']
+
+        user = get_login_user(request)
+        if user is not None:
+            redis_conn = get_redis_connection('cart')
+            selected_key = constants.CART_SELECTED_KEY % user.id
+            if selected:
+                sku_ids = redis_conn.hkeys(constants.CART_KEY % user.id)
+                pl = redis_conn.pipeline()
+                pl.delete(selected_key)
+                if sku_ids:
+                    pl.sadd(selected_key, *sku_ids)
+                pl.execute()
+            else:
+                redis_conn.delete(selected_key)
+            return Response({'message': 'OK'})
+
+        cart = get_cookie_cart(request)
+        for item in cart.values():
+            item['selected'] = selected
+
+        response = Response({'message': 'OK'})
+        set_cookie_cart(response, cart)
+        return response
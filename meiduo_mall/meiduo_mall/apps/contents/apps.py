@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class ContentsConfig(AppConfig):
     name = 'contents'
+
+    def ready(self):
+        # 注册信号：主页数据变化时重新生成静态主页
+        from . import signals
@@ -0,0 +1,17 @@
+# 主页静态化的防抖时间：首次修改后等待该时间再生成，期间的修改合并到同一次生成，单位：秒
+STATIC_INDEX_HTML_DEBOUNCE_SECONDS = 10
+
+# 主页静态化待生成标记的redis键
+STATIC_INDEX_HTML_PENDING_KEY = 'static_index_html_pending'
+
+# 待生成标记的有效期，防止任务丢失后标记一直存在导致不再生成，单位：秒
+STATIC_INDEX_HTML_PENDING_EXPIRES = 60 * 10
+
+# 广告内容缓存的redis键：hash类型，field为广告类别的key，value为该类别下展示的广告列表json
+CONTENTS_CACHE_KEY = 'contents'
+
+# 广告内容缓存中保存全部广告类别key列表的field
+CONTENT_SLOTS_FIELD = '*'
+
+# 广告内容缓存版本的redis键，每次失效时自增；重建前读取版本，写入时版本已变化则放弃写入
+CONTENTS_VERSION_KEY = 'contents_version'
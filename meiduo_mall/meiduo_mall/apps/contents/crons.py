@@ -1,11 +1,11 @@
-from collections import OrderedDict
 from django.conf import settings
 from django.template import loader
 import os
 import time
 
-from goods.models import GoodsChannel
-from .models import ContentCategory
+from goods.utils import get_category_menu
+from meiduo_mall.utils.static_files import publish_static_html
+from .utils import get_contents
 
 
 def generate_static_index_html():
@@ -13,54 +13,20 @@ def generate_static_index_html():
     生成静态的主页html文件
     """
     print('%s: generate_static_index_html' % time.ctime())
-    # 商品频道及分类菜单
-    # 使用有序字典保存类别的顺序
-    # categories = {
-    #     1: { # 组1
-    #         'channels': [{'id':, 'name':, 'url':},{}, {}...],
-    #         'sub_cats': [{'id':, 'name':, 'sub_cats':[{},{}]}, {}, {}, ..]
-    #     },
-    #     2: { # 组2
-    #
-    #     }
-    # }
-    categories = OrderedDict()
-    channels = GoodsChannel.objects.order_by('group_id', 'sequence')
-    for channel in channels:
-        group_id = channel.group_id  # 当前组
+    # 商品频道及分类菜单：读取缓存的已渲染菜单片段，菜单没有变化时不需要查询数据库
+    category_menu = get_category_menu()
 
-        if group_id not in categories:
-            categories[group_id] = {'channels': [], 'sub_cats': []}
-
-        cat1 = channel.category  # 当前频道的类别
-
-        # 追加当前频道
-        categories[group_id]['channels'].append({
-            'id': cat1.id,
-            'name': cat1.name,
-            'url': channel.url
-        })
-        # 构建当前类别的子类别
-        for cat2 in cat1.goodscategory_set.all():
-            cat2.sub_cats = []
-            for cat3 in cat2.goodscategory_set.all():
-                cat2.sub_cats.append(cat3)
-            categories[group_id]['sub_cats'].append(cat2)
-
-    # 广告内容
-    contents = {}
-    content_categories = ContentCategory.objects.all()
-    for cat in content_categories:
-        contents[cat.key] = cat.content_set.filter(status=True).order_by('sequence')
+    # 广告内容：读取按广告类别缓存的已序列化广告
+    contents = get_contents()
 
     # 渲染模板
     context = {
-        'categories': categories,
+        'category_menu': category_menu.html,
         'contents': contents
     }
     template = loader.get_template('index.html')
     html_text = template.render(context)
     file_path = os.path.join(settings.GENERATED_STATIC_HTML_FILES_DIR, 'index.html')
-    with open(file_path, 'w', encoding='utf-8') as f:
-        f.write(html_text)
+    # 原子发布，并生成预压缩文件
+    publish_static_html(file_path, html_text)
 
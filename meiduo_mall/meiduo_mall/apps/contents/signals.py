@@ -0,0 +1,89 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django_redis import get_redis_connection
+from redis import RedisError
+
+from goods.models import GoodsChannel, GoodsCategory
+from .models import ContentCategory, Content
+from . import constants
+from .utils import invalidate_slot_contents, invalidate_all_contents
+from celery_tasks.html.tasks import generate_static_index_html
+from celery_tasks.images.tasks import generate_content_image_variants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+def schedule_static_index_html():
+    """
+    安排一次主页静态化
+    使用redis的SET NX设置待生成标记，只有设置成功的那次修改才真正发布异步任务，
+    防抖时间内的其他修改都合并到这一次生成中
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        scheduled = redis_conn.set(constants.STATIC_INDEX_HTML_PENDING_KEY, 1,
+                                   ex=constants.STATIC_INDEX_HTML_PENDING_EXPIRES, nx=True)
+    except RedisError as e:
+        # redis不可用时宁可多生成一次，也不能让主页内容过期
+        logger.error(e)
+        scheduled = True
+
+    if scheduled:
+        generate_static_index_html.apply_async(countdown=constants.STATIC_INDEX_HTML_DEBOUNCE_SECONDS)
+
+
+@receiver([post_save, post_delete], sender=GoodsChannel)
+@receiver([post_save, post_delete], sender=GoodsCategory)
+@receiver([post_save, post_delete], sender=ContentCategory)
+@receiver([post_save, post_delete], sender=Content)
+def on_index_data_changed(sender, **kwargs):
+    """
+    主页用到的数据发生变化时，在事务提交后安排主页静态化
+    """
+    transaction.on_commit(schedule_static_index_html)
+
+
+@receiver(pre_save, sender=Content)
+def on_content_saving(sender, instance, **kwargs):
+    """
+    记录广告修改前的类别和图片，广告换了类别时原类别的缓存也要失效，图片变化时才生成webp
+    """
+    instance.old_category_id = None
+    instance.old_image = None
+    if instance.pk is not None:
+        old = Content.objects.filter(pk=instance.pk).values_list('category_id', 'image').first()
+        if old is not None:
+            instance.old_category_id, instance.old_image = old
+
+
+@receiver([post_save, post_delete], sender=Content)
+def on_content_changed(sender, instance, **kwargs):
+    """
+    广告变化后，在事务提交后使其所属广告类别的缓存失效
+    """
+    category_ids = {instance.category_id, getattr(instance, 'old_category_id', None)}
+    keys = list(ContentCategory.objects.filter(id__in=category_ids).values_list('key', flat=True))
+    if keys:
+        transaction.on_commit(lambda: invalidate_slot_contents(*keys))
+
+
+@receiver([post_save, post_delete], sender=ContentCategory)
+def on_content_category_changed(sender, **kwargs):
+    """
+    广告类别变化后，在事务提交后使全部广告缓存失效
+    """
+    transaction.on_commit(invalidate_all_contents)
+
+
+@receiver(post_save, sender=Content)
+def on_content_image_saved(sender, instance, **kwargs):
+    """
+    广告图片新增或更换后，在事务提交后异步生成广告图片的webp，只修改标题、顺序、状态时不需要
+    """
+    if instance.image and instance.image.name != getattr(instance, 'old_image', None):
+        content_id = instance.id
+        transaction.on_commit(lambda: generate_content_image_variants.delay(content_id))
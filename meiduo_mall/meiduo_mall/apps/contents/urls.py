@@ -0,0 +1,9 @@
+from django.conf.urls import url
+
+from . import views
+
+
+urlpatterns = [
+    # 广告类别下展示的广告
+    url(r'^contents/(?P<key>\w+)/$', views.SlotContentsView.as_view()),
+]
@@ -0,0 +1,175 @@
+from django_redis import get_redis_connection
+from redis import RedisError, WatchError
+import json
+
+from goods.images import get_file_id, get_image_variants, get_variant_url
+from .models import ContentCategory, Content
+from . import constants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+def serialize_content(content, variants=None):
+    """
+    广告内容序列化成字典，图片转换成完整的url，模板和接口直接使用
+    :param variants: get_image_variants()的结果，用于取出图片的webp版本
+    """
+    return {
+        'title': content.title,
+        'url': content.url,
+        'image_url': content.image.url if content.image else '',
+        'webp_url': get_variant_url(variants or {}, get_file_id(content.image), 'webp'),
+        'text': content.text or '',
+    }
+
+
+def _get_contents_version():
+    """
+    读取广告内容缓存的版本，需要在查询数据库之前读取
+    :return: 版本，redis不可用时返回None，此时不写入缓存
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        return redis_conn.get(constants.CONTENTS_VERSION_KEY) or b'0'
+    except RedisError as e:
+        logger.error(e)
+        return None
+
+
+def _cache_slots(version, slots):
+    """
+    版本没有变化时才写入缓存
+    查询数据库之后、写入之前缓存被失效，说明查询到的可能是旧数据，写入后会一直留在缓存中，放弃写入
+    :param version: 查询数据库之前读取的版本
+    :param slots: {field: json}
+    """
+    if version is None or not slots:
+        return
+    try:
+        redis_conn = get_redis_connection('default')
+        with redis_conn.pipeline() as pl:
+            pl.watch(constants.CONTENTS_VERSION_KEY)
+            if (pl.get(constants.CONTENTS_VERSION_KEY) or b'0') == version:
+                pl.multi()
+                pl.hmset(constants.CONTENTS_CACHE_KEY, slots)
+                pl.execute()
+    except WatchError:
+        pass
+    except RedisError as e:
+        logger.error(e)
+
+
+def build_slot_contents(keys, version=None):
+    """
+    从数据库查询指定广告类别下展示的广告，序列化后保存到缓存
+    :param keys: 广告类别的key列表
+    :param version: 调用者查询数据库之前读取的缓存版本，None时在查询之前读取
+    :return: {key: 广告列表json}
+    """
+    if version is None:
+        version = _get_contents_version()
+
+    slots = {key: [] for key in keys}
+    contents = list(Content.objects.filter(category__key__in=keys, status=True).select_related('category').order_by('sequence'))
+    variants = get_image_variants([get_file_id(content.image) for content in contents])
+    for content in contents:
+        slots[content.category.key].append(serialize_content(content, variants))
+
+    slots = {key: json.dumps(items, ensure_ascii=False, separators=(',', ':')) for key, items in slots.items()}
+    _cache_slots(version, slots)
+    return slots
+
+
+def _get_cached_slots():
+    """
+    一次读取整个缓存和缓存的版本
+    :return: ({field: json}, 版本)
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        pl = redis_conn.pipeline()
+        pl.hgetall(constants.CONTENTS_CACHE_KEY)
+        pl.get(constants.CONTENTS_VERSION_KEY)
+        cached, version = pl.execute()
+    except RedisError as e:
+        logger.error(e)
+        return {}, None
+    return {field.decode(): value.decode() for field, value in cached.items()}, version or b'0'
+
+
+def get_contents():
+    """
+    获取全部广告类别下展示的广告
+    一次读取整个缓存，只有失效的广告类别才查询数据库
+    :return: {广告类别key: [{'title':, 'url':, 'image_url':, 'webp_url':, 'text':}, ...]}
+    """
+    cached, version = _get_cached_slots()
+
+    slot_keys = cached.pop(constants.CONTENT_SLOTS_FIELD, None)
+    if slot_keys is None:
+        keys = list(ContentCategory.objects.values_list('key', flat=True))
+        _cache_slots(version, {constants.CONTENT_SLOTS_FIELD: json.dumps(keys)})
+    else:
+        keys = json.loads(slot_keys)
+
+    missing = [key for key in keys if key not in cached]
+    if missing:
+        cached.update(build_slot_contents(missing, version))
+
+    return {key: json.loads(cached[key]) for key in keys}
+
+
+def get_slot_contents_json(key):
+    """
+    获取一个广告类别下展示的广告json
+    :return: 广告列表json，广告类别不存在时返回None
+    """
+    version = None
+    try:
+        redis_conn = get_redis_connection('default')
+        pl = redis_conn.pipeline()
+        pl.hget(constants.CONTENTS_CACHE_KEY, key)
+        pl.get(constants.CONTENTS_VERSION_KEY)
+        value, version = pl.execute()
+        version = version or b'0'
+    except RedisError as e:
+        logger.error(e)
+        value = None
+
+    if value is not None:
+        return value.decode()
+
+    if not ContentCategory.objects.filter(key=key).exists():
+        return None
+    return build_slot_contents([key], version)[key]
+
+
+def invalidate_slot_contents(*keys):
+    """
+    广告变化后使其所属广告类别的缓存失效，同时增加版本，正在重建的旧数据不会再写入
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        pl = redis_conn.pipeline()
+        pl.incr(constants.CONTENTS_VERSION_KEY)
+        pl.hdel(constants.CONTENTS_CACHE_KEY, *keys)
+        pl.execute()
+    except RedisError as e:
+        logger.error(e)
+
+
+def invalidate_all_contents():
+    """
+    广告类别变化（新增、删除、修改key）后使全部广告缓存失效，同时增加版本
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        pl = redis_conn.pipeline()
+        pl.incr(constants.CONTENTS_VERSION_KEY)
+        pl.delete(constants.CONTENTS_CACHE_KEY)
+        pl.execute()
+    except RedisError as e:
+        logger.error(e)
@@ -1,3 +1,23 @@
-from django.shortcuts import render
+from django.http import HttpResponse
+from rest_framework.views import APIView
+from rest_framework.response import Response
+from rest_framework import status
 
+from .utils import get_slot_contents_json
 # Create your views here.
+
+
+# url(r'^contents/(?P<key>\w+)/$', views.SlotContentsView.as_view()),
+class SlotContentsView(APIView):
+    """
+    广告类别下展示的广告
+    """
+    def get(self, request, key):
+        """
+        直接返回缓存中已序列化好的广告json
+        """
+        content = get_slot_contents_json(key)
+        if content is None:
+            return Response({'message': '广告类别不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        return HttpResponse(content, content_type='application/json')
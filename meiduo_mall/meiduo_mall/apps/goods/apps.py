@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class GoodsConfig(AppConfig):
     name = 'goods'
+
+    def ready(self):
+        # 注册信号：sku详情数据变化时重新生成静态详情页
+        from . import signals
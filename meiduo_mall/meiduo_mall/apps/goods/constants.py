@@ -0,0 +1,65 @@
+# 批量生成商品详情页时，每个工作进程一次处理的sku数量
+GENERATE_DETAIL_HTML_CHUNK_SIZE = 200
+
+# 当前类别菜单版本的redis键
+CATEGORY_MENU_VERSION_KEY = 'category_menu_version'
+
+# 类别菜单内容的redis键，%s为内容版本（菜单json的哈希）
+CATEGORY_MENU_KEY = 'category_menu_%s'
+
+# 类别菜单内容的有效期，单位：秒
+CATEGORY_MENU_EXPIRES = 60 * 60 * 24 * 7
+
+# 上次批量生成详情页时使用的类别菜单版本，菜单变化后需要全部重新生成
+DETAIL_HTML_MENU_VERSION_KEY = 'detail_html_category_menu_version'
+
+# 类别热销排行的redis键：sorted set，member为sku_id，score为销量，%s为类别id
+HOT_SKUS_KEY = 'hot_skus_%s'
+
+# 热销排行默认返回的数量
+HOT_SKUS_COUNT = 10
+
+# 全量重建热销排行时每次提交到redis的sku数量
+HOT_SKUS_REBUILD_BATCH_SIZE = 1000
+
+# 商品规格选项与sku对应关系的redis键，%s为商品id
+GOODS_SPECS_KEY = 'goods_specs_%s'
+
+# 商品规格选项与sku对应关系的有效期，单位：秒
+GOODS_SPECS_EXPIRES = 60 * 60 * 24
+
+# 商品类别版本的redis键，频道、类别变化时自增，各进程据此重新加载类别祖先关系
+CATEGORY_VERSION_KEY = 'category_version'
+
+# 进程内类别祖先关系检查版本的间隔，单位：秒
+CATEGORY_ANCESTRY_CHECK_INTERVAL = 5
+
+# 扣减库存遇到死锁、锁等待超时时的最大尝试次数
+DEDUCT_STOCK_MAX_ATTEMPTS = 3
+
+# 扣减库存重试前等待的基础时间，单位：秒，每次重试递增并加入随机抖动
+DEDUCT_STOCK_RETRY_DELAY = 0.05
+
+# 图片衍生版本：名称 -> (缩放后的最大宽高, 格式)，最大宽高为None表示保持原尺寸
+IMAGE_VARIANTS = {
+    'webp': (None, 'WEBP'),
+    'medium': ((350, 350), 'JPEG'),
+    'medium_webp': ((350, 350), 'WEBP'),
+    'small': ((100, 100), 'JPEG'),
+    'small_webp': ((100, 100), 'WEBP'),
+}
+
+# sku图片生成的衍生版本：详情页主图使用原尺寸webp，列表页和详情页图片列表使用medium，热销和浏览历史使用small
+SKU_IMAGE_VARIANTS = ('webp', 'medium', 'medium_webp', 'small', 'small_webp')
+
+# 广告图片生成的衍生版本：各广告位尺寸不同，只生成原尺寸的webp
+CONTENT_IMAGE_VARIANTS = ('webp',)
+
+# 衍生图片的压缩质量
+IMAGE_VARIANT_QUALITY = 80
+
+# 全文检索索引增量更新等待写锁超时（例如正在全量重建）时的最大重试次数
+SEARCH_INDEX_UPDATE_MAX_RETRIES = 10
+
+# 全文检索索引增量更新重试前等待的时间，单位：秒
+SEARCH_INDEX_UPDATE_RETRY_DELAY = 30
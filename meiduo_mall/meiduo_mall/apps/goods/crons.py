@@ -0,0 +1,12 @@
+import time
+
+from .rankings import rebuild_hot_sku_rankings as rebuild
+
+
+def rebuild_hot_sku_rankings():
+    """
+    定时全量重建类别热销排行
+    """
+    print('%s: rebuild_hot_sku_rankings' % time.ctime())
+    count = rebuild()
+    print('%s: rebuilt hot sku rankings of %d categories' % (time.ctime(), count))
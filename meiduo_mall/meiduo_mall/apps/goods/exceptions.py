@@ -0,0 +1,8 @@
+class StockNotEnoughException(Exception):
+    """自定义库存不足的异常
+    sku不存在、已下架或库存不足时抛出，已扣减的库存随事务回滚
+    """
+    def __init__(self, sku_id, count):
+        super().__init__('sku %s stock not enough for %s' % (sku_id, count))
+        self.sku_id = sku_id
+        self.count = count
@@ -0,0 +1,100 @@
+from io import BytesIO
+from PIL import Image
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+import re
+
+from .models import ImageVariant
+from . import constants
+
+
+# file_id的格式：group1/M00/00/02/CtM3BVrRdPeAXNDMAAYJrpessGQ9777651.jpg
+_FILE_ID_RE = re.compile(r'(group\d+/M[0-9A-F]{2}/.+)$')
+
+
+def get_file_id(image):
+    """
+    取出图片的file_id
+    :param image: ImageField的文件对象，或者保存在CharField中的完整url（例如SKU.default_image_url）
+    :return: file_id，不是fastdfs的图片时返回空字符串
+    """
+    if not image:
+        return ''
+    name = getattr(image, 'name', image)
+    match = _FILE_ID_RE.search(name)
+    return match.group(1) if match else ''
+
+
+def render_image_variant(image, size, image_format):
+    """
+    生成一个衍生版本：等比缩小到size以内（不放大），转换为目标格式
+    :return: 图片的bytes
+    """
+    variant = image.copy()
+    if size is not None:
+        variant.thumbnail(size, Image.LANCZOS)
+
+    if image_format == 'JPEG':
+        # jpeg不支持透明通道和调色板
+        if variant.mode not in ('RGB', 'L'):
+            variant = variant.convert('RGB')
+        options = {'quality': constants.IMAGE_VARIANT_QUALITY, 'optimize': True, 'progressive': True}
+    else:
+        if variant.mode not in ('RGB', 'RGBA'):
+            variant = variant.convert('RGBA' if 'transparency' in variant.info or 'A' in variant.mode else 'RGB')
+        options = {'quality': constants.IMAGE_VARIANT_QUALITY}
+
+    buffer = BytesIO()
+    variant.save(buffer, format=image_format, **options)
+    return buffer.getvalue()
+
+
+def generate_image_variants(file_id, names):
+    """
+    为原图生成缺少的衍生版本，上传后记录衍生图片的file_id
+    已经生成过的版本不会重复生成；衍生图片的上传同样按内容去重
+    :param names: 衍生版本名称，见constants.IMAGE_VARIANTS
+    :return: 新生成的数量
+    """
+    if not file_id:
+        return 0
+
+    existing = set(ImageVariant.objects.filter(source=file_id, name__in=names).values_list('name', flat=True))
+    missing = [name for name in names if name not in existing]
+    if not missing:
+        return 0
+
+    with default_storage.open(file_id) as image_file:
+        image = Image.open(image_file)
+        image.load()
+
+    for name in missing:
+        size, image_format = constants.IMAGE_VARIANTS[name]
+        content = render_image_variant(image, size, image_format)
+        ext = 'webp' if image_format == 'WEBP' else 'jpg'
+        variant_file_id = default_storage.save('%s.%s' % (name, ext), ContentFile(content))
+        ImageVariant.objects.update_or_create(source=file_id, name=name, defaults={'file_id': variant_file_id})
+
+    return len(missing)
+
+
+def get_image_variants(file_ids):
+    """
+    一次查询多张原图的衍生版本
+    :return: {原图file_id: {版本名称: 衍生图片的url}}
+    """
+    file_ids = [file_id for file_id in set(file_ids) if file_id]
+    variants = {}
+    if not file_ids:
+        return variants
+
+    for source, name, file_id in ImageVariant.objects.filter(source__in=file_ids).values_list('source', 'name', 'file_id'):
+        variants.setdefault(source, {})[name] = default_storage.url(file_id)
+    return variants
+
+
+def get_variant_url(variants, file_id, name, default=''):
+    """
+    从get_image_variants()的结果中取出衍生图片的url，还没有生成时返回default
+    """
+    return variants.get(file_id, {}).get(name, default)
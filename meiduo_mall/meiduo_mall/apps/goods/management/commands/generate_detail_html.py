@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from goods.static_html import generate_static_sku_detail_htmls
+from goods import constants
+
+
+class Command(BaseCommand):
+    """
+    生成上架sku的静态详情页
+    python manage.py generate_detail_html [--force] [--processes 8]
+    """
+    help = '增量生成上架sku的静态详情页'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', dest='force', default=False,
+                            help='忽略增量判断，全部重新生成')
+        parser.add_argument('--processes', type=int, dest='processes', default=None,
+                            help='进程数，默认为cpu核数')
+        parser.add_argument('--chunk-size', type=int, dest='chunk_size',
+                            default=constants.GENERATE_DETAIL_HTML_CHUNK_SIZE,
+                            help='每个任务处理的sku数量')
+
+    def handle(self, *args, **options):
+        count = generate_static_sku_detail_htmls(
+            force=options['force'],
+            processes=options['processes'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write('generated %d sku detail html files' % count)
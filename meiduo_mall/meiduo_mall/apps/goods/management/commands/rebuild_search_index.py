@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from goods.search import rebuild_index
+
+
+class Command(BaseCommand):
+    """
+    全量重建sku全文检索索引
+    python manage.py rebuild_search_index
+    """
+    help = '全量重建sku全文检索索引'
+
+    def handle(self, *args, **options):
+        count = rebuild_index()
+        self.stdout.write('indexed %d skus' % count)
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goods', '0003_sku_list_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImageVariant',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('create_time', models.DateTimeField(auto_now_add=True, verbose_name='创建时间')),
+                ('update_time', models.DateTimeField(auto_now=True, verbose_name='更新时间')),
+                ('source', models.CharField(max_length=200, verbose_name='原图')),
+                ('name', models.CharField(max_length=20, verbose_name='版本')),
+                ('file_id', models.CharField(max_length=200, verbose_name='衍生图片')),
+            ],
+            options={
+                'verbose_name': '图片衍生版本',
+                'verbose_name_plural': '图片衍生版本',
+                'db_table': 'tb_image_variant',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='imagevariant',
+            unique_together=set([('source', 'name')]),
+        ),
+    ]
@@ -136,6 +136,12 @@ class SKU(BaseModel):
         db_table = 'tb_sku'
         verbose_name = '商品SKU'
         verbose_name_plural = verbose_name
+        # 商品列表页按类别、是否上架过滤，按创建时间、价格、销量排序，id用于排序值相同时的游标分页
+        indexes = [
+            models.Index(fields=['category', 'is_launched', 'create_time', 'id'], name='sku_cat_create_time_idx'),
+            models.Index(fields=['category', 'is_launched', 'price', 'id'], name='sku_cat_price_idx'),
+            models.Index(fields=['category', 'is_launched', 'sales', 'id'], name='sku_cat_sales_idx'),
+        ]
 
     def __str__(self):
         return '%s: %s' % (self.id, self.name)
@@ -172,3 +178,22 @@ class SKUSpecification(BaseModel):
 
     def __str__(self):
         return '%s: %s - %s' % (self.sku, self.spec.name, self.option.value)
+
+
+class ImageVariant(BaseModel):
+    """
+    图片衍生版本：缩略图、webp
+    source是原图的file_id，sku图片、sku默认图片、广告图片都按原图的file_id查找衍生版本
+    """
+    source = models.CharField(max_length=200, verbose_name='原图')
+    name = models.CharField(max_length=20, verbose_name='版本')
+    file_id = models.CharField(max_length=200, verbose_name='衍生图片')
+
+    class Meta:
+        db_table = 'tb_image_variant'
+        verbose_name = '图片衍生版本'
+        verbose_name_plural = verbose_name
+        unique_together = ('source', 'name')
+
+    def __str__(self):
+        return '%s %s' % (self.source, self.name)
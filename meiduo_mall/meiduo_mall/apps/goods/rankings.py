@@ -0,0 +1,108 @@
+from django_redis import get_redis_connection
+from redis import RedisError
+import uuid
+
+from .models import SKU
+from . import constants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+def get_hot_sku_ids(category_id, count=constants.HOT_SKUS_COUNT):
+    """
+    获取类别的热销sku，只执行一次ZREVRANGE，不查询数据库
+    redis不可用时按销量查询数据库
+    :return: 按销量从高到低排列的sku_id列表
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        sku_ids = redis_conn.zrevrange(constants.HOT_SKUS_KEY % category_id, 0, count - 1)
+    except RedisError as e:
+        logger.error(e)
+        skus = SKU.objects.filter(category_id=category_id, is_launched=True).order_by('-sales')
+        return list(skus.values_list('id', flat=True)[:count])
+    return [int(sku_id) for sku_id in sku_ids]
+
+
+def incr_hot_sku_sales(items):
+    """
+    销售后增量更新热销排行
+    :param items: [(category_id, sku_id, 销售数量), ...]
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        pl = redis_conn.pipeline()
+        for category_id, sku_id, count in items:
+            pl.zincrby(name=constants.HOT_SKUS_KEY % category_id, value=sku_id, amount=count)
+        pl.execute()
+    except RedisError as e:
+        # 排行的偏差由定时全量重建修正
+        logger.error(e)
+
+
+def update_hot_sku(sku):
+    """
+    sku保存后同步热销排行：上架的sku以当前销量加入排行，下架的sku移出排行
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        key = constants.HOT_SKUS_KEY % sku.category_id
+        if sku.is_launched:
+            redis_conn.zadd(key, {sku.id: sku.sales})
+        else:
+            redis_conn.zrem(key, sku.id)
+    except RedisError as e:
+        logger.error(e)
+
+
+def remove_hot_sku(sku):
+    """
+    sku删除后移出热销排行
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        redis_conn.zrem(constants.HOT_SKUS_KEY % sku.category_id, sku.id)
+    except RedisError as e:
+        logger.error(e)
+
+
+def rebuild_hot_sku_rankings():
+    """
+    根据tb_sku的销量全量重建所有类别的热销排行，修正增量更新的偏差
+    每个类别先写入临时键，写完后RENAME为正式键，读取者不会看到构建了一半的排行
+    :return: 重建的类别数量
+    """
+    redis_conn = get_redis_connection('default')
+    suffix = uuid.uuid4().hex
+
+    tmp_keys = {}
+    pl = redis_conn.pipeline()
+    batch = 0
+    skus = SKU.objects.filter(is_launched=True).order_by('category_id').values_list('category_id', 'id', 'sales')
+    for category_id, sku_id, sales in skus.iterator():
+        if category_id not in tmp_keys:
+            tmp_keys[category_id] = '%s_%s' % (constants.HOT_SKUS_KEY % category_id, suffix)
+        pl.zadd(tmp_keys[category_id], {sku_id: sales})
+        batch += 1
+        if batch >= constants.HOT_SKUS_REBUILD_BATCH_SIZE:
+            pl.execute()
+            batch = 0
+    pl.execute()
+
+    # 原子替换正式键
+    pl = redis_conn.pipeline()
+    for category_id, tmp_key in tmp_keys.items():
+        pl.rename(tmp_key, constants.HOT_SKUS_KEY % category_id)
+    pl.execute()
+
+    # 删除已经没有上架sku的类别的排行
+    valid_keys = {(constants.HOT_SKUS_KEY % category_id).encode() for category_id in tmp_keys}
+    stale_keys = [key for key in redis_conn.scan_iter(match=constants.HOT_SKUS_KEY % '*')
+                  if key not in valid_keys and key.split(b'_')[-1].isdigit()]
+    if stale_keys:
+        redis_conn.delete(*stale_keys)
+
+    return len(tmp_keys)
@@ -0,0 +1,343 @@
+# sku全文检索
+# 不依赖外部搜索引擎，倒排索引保存在本机的sqlite文件中：
+# docs(sku_id, length)             每个sku的加权词数
+# postings(term, sku_id, impact)   词 -> sku 的倒排表，impact为bm25中词频部分的得分，写入时计算
+# terms(term, df)                  每个词的文档频率，写入时维护，查询时不需要统计倒排表
+# meta(key, value)                 sku总数、总词数，用于计算bm25
+# 中文按二元组（bigram）切词，英文和数字按单词切词；使用WAL模式，写入时不阻塞查询
+from collections import Counter, OrderedDict
+from django.conf import settings
+import math
+import os
+import re
+import sqlite3
+import threading
+
+from .models import SKU
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+# 各字段的权重：名称最重要，其次是品牌和类别，副标题最低
+FIELD_WEIGHTS = (
+    ('name', 3),
+    ('brand', 2),
+    ('category', 2),
+    ('caption', 1),
+)
+
+# bm25参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 单个汉字查询按前缀匹配二元组时，最多展开的词数
+PREFIX_EXPANSION_LIMIT = 50
+
+_CJK = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN_RE = re.compile(r'([%s]+)|([^\W_%s]+)' % (_CJK, _CJK))
+
+# 每个查询词最多取出的候选sku数量，按得分从高到低取
+SEARCH_CANDIDATE_LIMIT = 1000
+
+# 候选sku补查倒排记录时每条sql的sku数量
+SEARCH_LOOKUP_BATCH_SIZE = 500
+
+# 索引结构的版本，保存在sqlite的user_version中，结构变化时需要重建索引
+_SCHEMA_VERSION = 2
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS docs (
+        sku_id INTEGER PRIMARY KEY,
+        length REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS postings (
+        term TEXT NOT NULL,
+        sku_id INTEGER NOT NULL,
+        impact REAL NOT NULL,
+        PRIMARY KEY (term, sku_id)
+    ) WITHOUT ROWID
+    """,
+    'CREATE INDEX IF NOT EXISTS postings_sku_id ON postings (sku_id)',
+    'CREATE INDEX IF NOT EXISTS postings_term_impact ON postings (term, impact DESC)',
+    """
+    CREATE TABLE IF NOT EXISTS terms (
+        term TEXT PRIMARY KEY,
+        df INTEGER NOT NULL
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value REAL NOT NULL
+    )
+    """,
+)
+
+# 每个线程复用的索引连接：conns为{索引文件路径: 连接}，pid为打开连接的进程号
+_local = threading.local()
+
+
+def tokenize(text):
+    """
+    切词：连续的汉字切成二元组（只有一个汉字时保留单字），其他连续的字母数字作为一个词，统一小写
+    '华为Mate10手机' -> ['华为', 'mate10', '手机']
+    """
+    tokens = []
+    for cjk, word in _TOKEN_RE.findall(text or ''):
+        if cjk:
+            if len(cjk) == 1:
+                tokens.append(cjk)
+            else:
+                tokens.extend(cjk[i:i + 2] for i in range(len(cjk) - 1))
+        else:
+            tokens.append(word.lower())
+    return tokens
+
+
+def _is_single_cjk(token):
+    return len(token) == 1 and _TOKEN_RE.match(token).group(1) is not None
+
+
+def _init_schema(conn):
+    """
+    创建表结构，每个连接打开时执行一次；旧版本的索引结构不同，删除后需要重建索引
+    """
+    if conn.execute('PRAGMA user_version').fetchone()[0] == _SCHEMA_VERSION:
+        return
+
+    # journal_mode不能在事务中修改，设置后保存在索引文件中
+    conn.execute('PRAGMA journal_mode=WAL')
+    with conn:
+        conn.execute('BEGIN IMMEDIATE')
+        # 其他进程可能已经完成了初始化
+        if conn.execute('PRAGMA user_version').fetchone()[0] == _SCHEMA_VERSION:
+            return
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'postings'").fetchone():
+            logger.error('sku search index schema changed, run: python manage.py rebuild_search_index')
+            for table in ('postings', 'docs', 'terms', 'meta'):
+                conn.execute('DROP TABLE IF EXISTS %s' % table)
+        for statement in _SCHEMA:
+            conn.execute(statement)
+        conn.execute('PRAGMA user_version = %d' % _SCHEMA_VERSION)
+
+
+def get_connection(path=None):
+    """
+    获取当前线程的索引连接，同一线程的所有操作复用一个连接，首次打开时创建表结构
+    fork出的子进程不能使用父进程的连接，发现进程号变化时重新打开
+    """
+    path = path or settings.SKU_SEARCH_INDEX_PATH
+    if getattr(_local, 'pid', None) != os.getpid():
+        _local.conns = {}
+        _local.pid = os.getpid()
+
+    conn = _local.conns.get(path)
+    if conn is None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=10)
+        conn.execute('PRAGMA synchronous=NORMAL')
+        _init_schema(conn)
+        _local.conns[path] = conn
+    return conn
+
+
+def _sku_document(sku):
+    """
+    计算sku的加权词频
+    :return: (Counter{term: tf}, 加权词数)
+    """
+    fields = {
+        'name': sku.name,
+        'brand': sku.goods.brand.name,
+        'category': ' '.join([sku.goods.category1.name, sku.goods.category2.name, sku.category.name]),
+        'caption': sku.caption,
+    }
+    terms = Counter()
+    length = 0
+    for field, weight in FIELD_WEIGHTS:
+        for token in tokenize(fields[field]):
+            terms[token] += weight
+            length += weight
+    return terms, length
+
+
+def _get_meta(conn):
+    return dict(conn.execute('SELECT key, value FROM meta').fetchall())
+
+
+def _incr_meta(conn, doc_count, total_length):
+    for key, value in (('doc_count', doc_count), ('total_length', total_length)):
+        conn.execute('INSERT OR IGNORE INTO meta (key, value) VALUES (?, 0)', (key,))
+        conn.execute('UPDATE meta SET value = value + ? WHERE key = ?', (value, key))
+
+
+def _incr_df(conn, terms, delta):
+    """
+    修改词的文档频率，文档频率减到0的词删除，单个汉字前缀展开时不会再匹配到
+    """
+    conn.executemany('INSERT OR IGNORE INTO terms (term, df) VALUES (?, 0)', [(term,) for term in terms])
+    conn.executemany('UPDATE terms SET df = df + ? WHERE term = ?', [(delta, term) for term in terms])
+    if delta < 0:
+        conn.executemany('DELETE FROM terms WHERE term = ? AND df <= 0', [(term,) for term in terms])
+
+
+def _impact(tf, length, avg_length):
+    """
+    bm25中词频部分的得分，写入索引时计算，查询时乘以idf即为该词的得分
+    平均长度使用写入时的值，全量重建时统一修正
+    """
+    return tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+
+
+def _insert_document(conn, sku_id, terms, length, avg_length):
+    conn.executemany('INSERT INTO postings (term, sku_id, impact) VALUES (?, ?, ?)',
+                     [(term, sku_id, _impact(tf, length, avg_length)) for term, tf in terms.items()])
+    conn.execute('INSERT INTO docs (sku_id, length) VALUES (?, ?)', (sku_id, length))
+
+
+def _remove(conn, sku_id):
+    row = conn.execute('SELECT length FROM docs WHERE sku_id = ?', (sku_id,)).fetchone()
+    if row is not None:
+        terms = [term for term, in conn.execute('SELECT term FROM postings WHERE sku_id = ?', (sku_id,))]
+        conn.execute('DELETE FROM postings WHERE sku_id = ?', (sku_id,))
+        conn.execute('DELETE FROM docs WHERE sku_id = ?', (sku_id,))
+        _incr_df(conn, terms, -1)
+        _incr_meta(conn, -1, -row[0])
+
+
+def _add(conn, sku):
+    terms, length = _sku_document(sku)
+    if not terms:
+        return
+    meta = _get_meta(conn)
+    doc_count = meta.get('doc_count', 0)
+    avg_length = meta.get('total_length', 0) / doc_count if doc_count > 0 else length
+    _insert_document(conn, sku.id, terms, length, avg_length)
+    _incr_df(conn, terms, 1)
+    _incr_meta(conn, 1, length)
+
+
+def _skus_for_index():
+    return SKU.objects.filter(is_launched=True).select_related(
+        'category', 'goods__brand', 'goods__category1', 'goods__category2')
+
+
+def update_sku_index(sku_id, path=None):
+    """
+    增量更新一个sku的索引：上架的sku重新索引，下架或已删除的sku移出索引
+    全量重建期间等待写锁超时会抛出sqlite3.OperationalError，由调用者重试
+    """
+    sku = _skus_for_index().filter(id=sku_id).first()
+
+    conn = get_connection(path)
+    with conn:
+        _remove(conn, sku_id)
+        if sku is not None:
+            _add(conn, sku)
+
+
+def rebuild_index(path=None):
+    """
+    全量重建索引
+    先在内存中计算全部sku的词频，再在一个事务中写入，持有写锁期间不查询mysql；
+    重建期间查询读取的仍是旧索引
+    :return: 索引的sku数量
+    """
+    documents = []
+    df = Counter()
+    total_length = 0
+    for sku in _skus_for_index().iterator():
+        terms, length = _sku_document(sku)
+        if terms:
+            documents.append((sku.id, terms, length))
+            df.update(terms.keys())
+            total_length += length
+    avg_length = total_length / len(documents) if documents else 0
+
+    conn = get_connection(path)
+    with conn:
+        for table in ('postings', 'docs', 'terms', 'meta'):
+            conn.execute('DELETE FROM %s' % table)
+        for sku_id, terms, length in documents:
+            _insert_document(conn, sku_id, terms, length, avg_length)
+        conn.executemany('INSERT INTO terms (term, df) VALUES (?, ?)', df.items())
+        _incr_meta(conn, len(documents), total_length)
+    return len(documents)
+
+
+def _lookup_postings(conn, term, sku_ids):
+    """
+    查询指定sku在某个词下的倒排记录
+    :return: {sku_id: impact}
+    """
+    postings = {}
+    for i in range(0, len(sku_ids), SEARCH_LOOKUP_BATCH_SIZE):
+        batch = sku_ids[i:i + SEARCH_LOOKUP_BATCH_SIZE]
+        rows = conn.execute('SELECT sku_id, impact FROM postings WHERE term = ? AND sku_id IN (%s)'
+                            % ','.join(['?'] * len(batch)), [term] + batch)
+        postings.update(rows)
+    return postings
+
+
+def search(query, offset=0, limit=20, path=None):
+    """
+    搜索sku
+    先按命中的查询词数量、再按bm25得分排序
+    每个查询词只按impact取前SEARCH_CANDIDATE_LIMIT个sku作为候选，候选再按全部查询词计算命中数和得分，
+    常见词也只读取有限的倒排记录；命中总数为候选的数量
+    :return: (命中的sku总数, 当前页的sku_id列表)
+    """
+    # 去重并保持顺序
+    tokens = list(OrderedDict.fromkeys(tokenize(query)))
+    if not tokens:
+        return 0, []
+
+    conn = get_connection(path)
+    doc_count = _get_meta(conn).get('doc_count', 0)
+    if doc_count <= 0:
+        return 0, []
+
+    # 查询词 -> (词, 文档频率, 查询词序号)，单个汉字展开为以它开头的文档频率最高的二元组
+    query_terms = []
+    words = []
+    for index, token in enumerate(tokens):
+        if _is_single_cjk(token):
+            rows = conn.execute('SELECT term, df FROM terms WHERE term >= ? AND term < ? ORDER BY df DESC LIMIT ?',
+                                (token, token + '\uffff', PREFIX_EXPANSION_LIMIT))
+            query_terms.extend((term, df, index) for term, df in rows)
+        else:
+            words.append((token, index))
+    if words:
+        dfs = dict(conn.execute('SELECT term, df FROM terms WHERE term IN (%s)' % ','.join(['?'] * len(words)),
+                                [token for token, _ in words]))
+        query_terms.extend((token, dfs[token], index) for token, index in words if token in dfs)
+
+    # 每个查询词取impact最高的候选
+    term_postings = []
+    candidates = set()
+    for term, df, index in query_terms:
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        rows = conn.execute('SELECT sku_id, impact FROM postings WHERE term = ? ORDER BY impact DESC LIMIT ?',
+                            (term, SEARCH_CANDIDATE_LIMIT))
+        postings = dict(rows)
+        candidates.update(postings)
+        term_postings.append((term, idf, index, postings, df > len(postings)))
+
+    # 截断了的查询词，补查其他候选在该词下的倒排记录
+    matched = {}
+    scores = Counter()
+    for term, idf, index, postings, truncated in term_postings:
+        if truncated:
+            postings.update(_lookup_postings(conn, term, [sku_id for sku_id in candidates if sku_id not in postings]))
+        for sku_id, impact in postings.items():
+            matched.setdefault(sku_id, set()).add(index)
+            scores[sku_id] += idf * impact
+
+    ranked = sorted(matched, key=lambda sku_id: (-len(matched[sku_id]), -scores[sku_id], sku_id))
+    return len(ranked), ranked[offset:offset + limit]
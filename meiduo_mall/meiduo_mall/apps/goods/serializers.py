@@ -0,0 +1,43 @@
+from rest_framework import serializers
+
+from .models import SKU
+from .images import get_file_id, get_image_variants, get_variant_url
+
+
+class SKUListSerializer(serializers.ListSerializer):
+    """
+    sku列表序列化器：一次查询出所有sku默认图片的衍生版本
+    """
+    def to_representation(self, data):
+        skus = list(data.all() if hasattr(data, 'all') else data)
+        self.child.image_variants = get_image_variants([get_file_id(sku.default_image_url) for sku in skus])
+        return super().to_representation(skus)
+
+
+class SKUSerializer(serializers.ModelSerializer):
+    """
+    商品列表序列化器
+    image_url、webp_image_url是列表页使用的缩略图，还没有生成缩略图时分别是原图和空字符串
+    """
+    image_url = serializers.SerializerMethodField()
+    webp_image_url = serializers.SerializerMethodField()
+
+    # 单个sku序列化时没有预先查询的衍生版本，按需查询
+    image_variants = None
+
+    class Meta:
+        model = SKU
+        fields = ('id', 'name', 'price', 'default_image_url', 'image_url', 'webp_image_url', 'comments')
+        list_serializer_class = SKUListSerializer
+
+    def _get_variants(self, sku):
+        if self.image_variants is None:
+            return get_image_variants([get_file_id(sku.default_image_url)])
+        return self.image_variants
+
+    def get_image_url(self, sku):
+        return get_variant_url(self._get_variants(sku), get_file_id(sku.default_image_url), 'medium',
+                               sku.default_image_url)
+
+    def get_webp_image_url(self, sku):
+        return get_variant_url(self._get_variants(sku), get_file_id(sku.default_image_url), 'medium_webp')
@@ -0,0 +1,134 @@
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from .models import GoodsCategory, GoodsChannel, Goods, GoodsSpecification, SpecificationOption, SKU, SKUImage, \
+    SKUSpecification
+from .utils import invalidate_category_menu, invalidate_category_ancestry, invalidate_goods_specs
+from .rankings import update_hot_sku, remove_hot_sku
+from celery_tasks.html.tasks import generate_static_sku_detail_html
+from celery_tasks.search.tasks import update_sku_search_index
+from celery_tasks.images.tasks import generate_sku_image_variants
+
+
+def schedule_static_goods_detail_html(goods_id, sku_ids=()):
+    """
+    事务提交后重新生成商品下所有sku的详情页
+    同一商品的sku详情页互相链接规格选项，任何一个sku变化都需要一起重新生成
+    :param sku_ids: 额外需要处理的sku，例如已删除的sku，需要删除其详情页
+    """
+    def schedule():
+        # 先使规格选项与sku的对应关系失效，详情页生成时读取的是最新的对应关系
+        invalidate_goods_specs(goods_id)
+
+        ids = set(SKU.objects.filter(goods_id=goods_id).values_list('id', flat=True))
+        ids.update(sku_ids)
+        for sku_id in ids:
+            generate_static_sku_detail_html.delay(sku_id)
+
+    transaction.on_commit(schedule)
+
+
+@receiver([post_save, post_delete], sender=Goods)
+def on_goods_changed(sender, instance, **kwargs):
+    schedule_static_goods_detail_html(instance.id)
+
+
+@receiver([post_save, post_delete], sender=SKU)
+def on_sku_changed(sender, instance, **kwargs):
+    schedule_static_goods_detail_html(instance.goods_id, [instance.id])
+
+
+@receiver([post_save, post_delete], sender=SKUImage)
+@receiver([post_save, post_delete], sender=SKUSpecification)
+def on_sku_detail_changed(sender, instance, **kwargs):
+    goods_id = SKU.objects.filter(id=instance.sku_id).values_list('goods_id', flat=True).first()
+    if goods_id is not None:
+        schedule_static_goods_detail_html(goods_id)
+
+
+@receiver([post_save, post_delete], sender=GoodsSpecification)
+def on_goods_specification_changed(sender, instance, **kwargs):
+    schedule_static_goods_detail_html(instance.goods_id)
+
+
+@receiver([post_save, post_delete], sender=SpecificationOption)
+def on_specification_option_changed(sender, instance, **kwargs):
+    goods_id = GoodsSpecification.objects.filter(id=instance.spec_id).values_list('goods_id', flat=True).first()
+    if goods_id is not None:
+        schedule_static_goods_detail_html(goods_id)
+
+
+@receiver([post_save, post_delete], sender=GoodsCategory)
+@receiver([post_save, post_delete], sender=GoodsChannel)
+def on_category_menu_changed(sender, **kwargs):
+    """
+    频道、类别变化后使缓存的类别菜单和各进程的类别祖先关系失效
+    先增加类别版本再删除菜单版本：之前开始的菜单渲染发现类别版本变化后不会重新发布旧菜单
+    """
+    transaction.on_commit(invalidate_category_ancestry)
+    transaction.on_commit(invalidate_category_menu)
+
+
+@receiver(post_save, sender=SKU)
+def on_sku_saved(sender, instance, **kwargs):
+    """
+    sku保存后同步热销排行
+    """
+    transaction.on_commit(lambda: update_hot_sku(instance))
+
+
+@receiver(post_delete, sender=SKU)
+def on_sku_deleted(sender, instance, **kwargs):
+    """
+    sku删除后移出热销排行
+    """
+    transaction.on_commit(lambda: remove_hot_sku(instance))
+
+
+@receiver([post_save, post_delete], sender=SKU)
+def on_sku_search_changed(sender, instance, **kwargs):
+    """
+    sku变化后增量更新全文检索索引
+    品牌、类别改名影响的sku较多，需要执行 python manage.py rebuild_search_index 重建索引
+    """
+    sku_id = instance.id
+    transaction.on_commit(lambda: update_sku_search_index.delay(sku_id))
+
+
+def schedule_sku_image_variants(sku_id):
+    """
+    在事务提交后异步生成sku图片的缩略图和webp
+    已生成过的版本会跳过，没有新图片时任务只有一次查询
+    """
+    transaction.on_commit(lambda: generate_sku_image_variants.delay(sku_id))
+
+
+@receiver(pre_save, sender=SKU)
+def on_sku_saving(sender, instance, update_fields=None, **kwargs):
+    """
+    记录sku修改前的默认图片，只有默认图片变化时才生成衍生版本，修改价格、库存等不需要
+    """
+    instance.old_default_image_url = None
+    if instance.pk is not None and (update_fields is None or 'default_image_url' in update_fields):
+        instance.old_default_image_url = SKU.objects.filter(pk=instance.pk).values_list(
+            'default_image_url', flat=True).first()
+
+
+@receiver(post_save, sender=SKU)
+def on_sku_default_image_saved(sender, instance, update_fields=None, **kwargs):
+    """
+    sku默认图片变化后生成衍生版本
+    """
+    if update_fields is not None and 'default_image_url' not in update_fields:
+        return
+    if instance.default_image_url and instance.default_image_url != getattr(instance, 'old_default_image_url', None):
+        schedule_sku_image_variants(instance.id)
+
+
+@receiver(post_save, sender=SKUImage)
+def on_sku_image_saved(sender, instance, **kwargs):
+    """
+    sku图片保存后生成衍生版本
+    """
+    schedule_sku_image_variants(instance.sku_id)
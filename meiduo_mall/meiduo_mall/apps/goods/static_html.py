@@ -0,0 +1,236 @@
+from multiprocessing import Pool
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+from django.template import loader
+from django_redis import get_redis_connection
+import os
+
+from meiduo_mall.utils.static_files import publish_static_html, remove_static_html
+from .models import SKU, SKUImage, SKUSpecification
+from .utils import get_breadcrumb, get_category_menu, get_goods_specs
+from .images import get_file_id, get_image_variants, get_variant_url
+from . import constants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+# 工作进程内缓存的类别菜单：一次批量生成中每个进程只加载一次
+_category_menu = None
+
+
+def get_sku_detail_html_path(sku_id):
+    """
+    sku静态详情页的文件路径：front_end_pc/goods/<sku_id>.html
+    """
+    return os.path.join(settings.GENERATED_STATIC_HTML_FILES_DIR, 'goods', '%s.html' % sku_id)
+
+
+def get_sku_detail_changes(sku_ids=None):
+    """
+    查询上架sku详情页数据的最后修改时间
+    详情页的内容来自sku、所属商品、sku图片、sku规格，取它们update_time的最大值
+    :param sku_ids: 只查询这些sku，None表示全部上架的sku
+    :return: {sku_id: 最后修改时间的时间戳}
+    """
+    skus = SKU.objects.filter(is_launched=True)
+    images = SKUImage.objects.filter(sku__is_launched=True)
+    specs = SKUSpecification.objects.filter(sku__is_launched=True)
+    if sku_ids is not None:
+        skus = skus.filter(id__in=sku_ids)
+        images = images.filter(sku_id__in=sku_ids)
+        specs = specs.filter(sku_id__in=sku_ids)
+
+    changes = {}
+    for sku_id, sku_time, goods_time in skus.values_list('id', 'update_time', 'goods__update_time'):
+        changes[sku_id] = max(sku_time, goods_time)
+
+    # 按sku分组取图片、规格的最后修改时间
+    for queryset in (images, specs):
+        rows = queryset.order_by().values('sku_id').annotate(last_time=Max('update_time'))
+        for sku_id, last_time in rows.values_list('sku_id', 'last_time'):
+            if sku_id in changes and last_time > changes[sku_id]:
+                changes[sku_id] = last_time
+
+    return {sku_id: last_time.timestamp() for sku_id, last_time in changes.items()}
+
+
+def get_sku_specs(sku):
+    """
+    构建sku的规格选项，每个选项附带切换到该选项后对应的sku_id
+    :return: [{'name':, 'options': [{'value':, 'sku_id':, 'selected':}, ...]}, ...]
+    """
+    goods_specs = get_goods_specs(sku.goods_id)
+    skus = goods_specs['skus']
+
+    # 当前sku的选项组合
+    current = None
+    for key, sku_id in skus.items():
+        if sku_id == sku.id:
+            current = key.split(',')
+            break
+
+    specs = []
+    for index, spec in enumerate(goods_specs['specs']):
+        options = []
+        for option in spec['options']:
+            sku_id = None
+            selected = False
+            if current is not None:
+                # 只替换当前规格的选项，其他规格保持当前sku的选项
+                key = current[:]
+                key[index] = str(option['id'])
+                sku_id = skus.get(','.join(key))
+                selected = current[index] == str(option['id'])
+            options.append({'value': option['value'], 'sku_id': sku_id, 'selected': selected})
+        specs.append({'name': spec['name'], 'options': options})
+
+    return specs
+
+
+def generate_static_sku_detail_html(sku_id, category_menu=None, mtime=None):
+    """
+    生成单个sku的静态详情页
+    sku不存在或已下架时删除已生成的详情页
+    :param category_menu: 类别菜单，批量生成时由调用者传入，避免每个sku都读取一次
+    :param mtime: 详情页数据的最后修改时间戳，写入文件的修改时间，用于增量生成时判断是否需要重新生成
+    :return: 是否生成了详情页
+    """
+    file_path = get_sku_detail_html_path(sku_id)
+
+    try:
+        sku = SKU.objects.select_related('goods').get(id=sku_id, is_launched=True)
+    except SKU.DoesNotExist:
+        remove_static_html(file_path)
+        return False
+
+    if category_menu is None:
+        category_menu = get_category_menu()
+    if mtime is None:
+        mtime = get_sku_detail_changes([sku_id]).get(sku_id)
+
+    # 图片优先使用衍生版本：主图使用原尺寸webp，图片列表使用缩略图，还没有生成衍生版本时使用原图
+    sku_images = list(SKUImage.objects.filter(sku_id=sku_id).order_by('id'))
+    default_file_id = get_file_id(sku.default_image_url)
+    variants = get_image_variants([default_file_id] + [get_file_id(image.image) for image in sku_images])
+
+    default_image = {
+        'url': sku.default_image_url,
+        'webp_url': get_variant_url(variants, default_file_id, 'webp'),
+    }
+    images = []
+    for image in sku_images:
+        file_id = get_file_id(image.image)
+        images.append({
+            'url': get_variant_url(variants, file_id, 'medium', image.image.url),
+            'webp_url': get_variant_url(variants, file_id, 'medium_webp'),
+        })
+
+    # 渲染模板
+    context = {
+        'category_menu': category_menu.html,
+        'breadcrumb': get_breadcrumb(sku.category_id),
+        'sku': sku,
+        'goods': sku.goods,
+        'specs': get_sku_specs(sku),
+        'default_image': default_image,
+        'images': images,
+    }
+    template = loader.get_template('detail.html')
+    html_text = template.render(context)
+
+    # 原子发布，并生成预压缩文件
+    publish_static_html(file_path, html_text, mtime)
+
+    return True
+
+
+def _is_sku_detail_html_fresh(sku_id, mtime):
+    """
+    详情页文件的修改时间等于数据的最后修改时间，说明生成之后数据没有变化
+    """
+    try:
+        return int(os.path.getmtime(get_sku_detail_html_path(sku_id))) == int(mtime)
+    except OSError:
+        return False
+
+
+def _init_worker():
+    """
+    工作进程初始化：加载一次类别菜单，进程内所有sku共用
+    """
+    global _category_menu
+    _category_menu = get_category_menu()
+
+
+def _generate_chunk(items):
+    """
+    工作进程中生成一批sku的详情页
+    :param items: [(sku_id, mtime), ...]
+    :return: (生成的数量, 失败的数量)，期间已下架、已删除的sku两者都不计
+    """
+    count = 0
+    failed = 0
+    for sku_id, mtime in items:
+        try:
+            if generate_static_sku_detail_html(sku_id, _category_menu, mtime):
+                count += 1
+        except Exception as e:
+            # 单个sku失败不影响整批，下次增量生成时会重试
+            logger.error('generate detail html of sku %s failed: %s' % (sku_id, e))
+            failed += 1
+    return count, failed
+
+
+def generate_static_sku_detail_htmls(force=False, processes=None, chunk_size=constants.GENERATE_DETAIL_HTML_CHUNK_SIZE):
+    """
+    使用进程池批量生成上架sku的静态详情页
+    默认增量生成：只生成数据在上次生成之后有变化的sku，并删除已下架、已删除sku的详情页；
+    类别菜单的版本和上次批量生成时不同时，所有详情页都需要重新生成
+    :param force: 是否忽略增量判断全部重新生成（例如修改了模板或者类别菜单）
+    :param processes: 进程数，默认为cpu核数；为1时在当前进程中生成，不创建进程池
+        （celery的工作进程是守护进程，不能再创建子进程）
+    :param chunk_size: 每个任务处理的sku数量
+    :return: 生成的数量
+    """
+    changes = get_sku_detail_changes()
+
+    redis_conn = get_redis_connection('default')
+    menu_version = get_category_menu().version
+    last_menu_version = redis_conn.get(constants.DETAIL_HTML_MENU_VERSION_KEY)
+    if last_menu_version is None or last_menu_version.decode() != menu_version:
+        force = True
+
+    # 删除已下架、已删除sku的详情页及其预压缩文件
+    html_dir = os.path.dirname(get_sku_detail_html_path(0))
+    if os.path.isdir(html_dir):
+        for file_name in os.listdir(html_dir):
+            name = file_name.split('.', 1)[0]
+            if name.isdigit() and int(name) not in changes:
+                os.remove(os.path.join(html_dir, file_name))
+
+    items = [(sku_id, mtime) for sku_id, mtime in sorted(changes.items())
+             if force or not _is_sku_detail_html_fresh(sku_id, mtime)]
+
+    count = 0
+    failed = 0
+    if items and processes == 1:
+        _init_worker()
+        count, failed = _generate_chunk(items)
+    elif items:
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        # 子进程不能共用父进程的数据库连接，fork之前先关闭，子进程会各自建立新的连接
+        connections.close_all()
+        with Pool(processes, initializer=_init_worker) as pool:
+            for chunk_count, chunk_failed in pool.imap_unordered(_generate_chunk, chunks):
+                count += chunk_count
+                failed += chunk_failed
+
+    # 没有失败才记录菜单版本，否则下次继续全部重新生成；期间下架、删除的sku不算失败
+    if not failed:
+        redis_conn.set(constants.DETAIL_HTML_MENU_VERSION_KEY, menu_version)
+    return count
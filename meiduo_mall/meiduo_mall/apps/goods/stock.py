@@ -0,0 +1,90 @@
+from collections import defaultdict
+from django.db import transaction, OperationalError
+from django.db.models import F
+import random
+import time
+
+from .exceptions import StockNotEnoughException
+from .models import SKU, Goods
+from .rankings import incr_hot_sku_sales
+from . import constants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+# mysql可以重试的错误：1213死锁，1205锁等待超时
+RETRYABLE_ERROR_CODES = (1213, 1205)
+
+
+def _is_retryable(error):
+    return bool(error.args) and error.args[0] in RETRYABLE_ERROR_CODES
+
+
+def _deduct(items):
+    """
+    在当前事务中扣减库存、增加销量
+    :param items: {sku_id: 数量}
+    :return: {sku_id: 扣减后的SKU}
+    """
+    # 按sku_id顺序加行锁，多个订单同时扣减相同的几个sku时不会互相死锁
+    for sku_id in sorted(items):
+        count = items[sku_id]
+        # 条件更新：库存的判断和扣减在同一条UPDATE中完成，并发的买家在行锁上排队，不会超卖
+        rows = SKU.objects.filter(id=sku_id, is_launched=True, stock__gte=count).update(
+            stock=F('stock') - count, sales=F('sales') + count)
+        if rows == 0:
+            raise StockNotEnoughException(sku_id, count)
+
+    skus = SKU.objects.in_bulk(list(items))
+
+    # 同一商品的多个sku合并为一次UPDATE
+    goods_sales = defaultdict(int)
+    for sku_id, sku in skus.items():
+        goods_sales[sku.goods_id] += items[sku_id]
+    for goods_id in sorted(goods_sales):
+        Goods.objects.filter(id=goods_id).update(sales=F('sales') + goods_sales[goods_id])
+
+    return skus
+
+
+def deduct_stock(items, max_attempts=constants.DEDUCT_STOCK_MAX_ATTEMPTS):
+    """
+    一个订单批量扣减多个sku的库存，并增加sku和商品的销量
+    所有sku在一个事务中扣减，任何一个库存不足则全部回滚；
+    遇到死锁、锁等待超时时整个事务有限次重试；
+    在外层事务中调用时（例如和创建订单在同一事务中），由外层事务负责重试
+    :param items: {sku_id: 数量}
+    :return: {sku_id: 扣减后的SKU}
+    """
+    items = {int(sku_id): int(count) for sku_id, count in items.items()}
+    for sku_id, count in items.items():
+        if count <= 0:
+            raise ValueError('invalid count %s for sku %s' % (count, sku_id))
+    if not items:
+        return {}
+
+    # 死锁会回滚整个外层事务，不能只重试保存点
+    if transaction.get_connection().in_atomic_block:
+        max_attempts = 1
+
+    attempt = 1
+    while True:
+        try:
+            with transaction.atomic():
+                skus = _deduct(items)
+            break
+        except OperationalError as e:
+            if attempt >= max_attempts or not _is_retryable(e):
+                raise
+            logger.warning('deduct stock attempt %s failed: %s' % (attempt, e))
+            time.sleep(constants.DEDUCT_STOCK_RETRY_DELAY * attempt * (1 + random.random()))
+            attempt += 1
+
+    # 扣减提交后更新热销排行；在外层事务中调用时，等外层事务提交后才更新
+    sales = [(sku.category_id, sku_id, items[sku_id]) for sku_id, sku in skus.items()]
+    transaction.on_commit(lambda: incr_hot_sku_sales(sales))
+
+    return skus
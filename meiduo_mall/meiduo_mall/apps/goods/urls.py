@@ -0,0 +1,19 @@
+from django.conf.urls import url
+
+from . import views
+
+
+urlpatterns = [
+    # 商品频道及分类菜单
+    url(r'^categories/menu/$', views.CategoryMenuView.as_view()),
+    # 商品列表页面包屑导航
+    url(r'^categories/(?P<pk>\d+)/$', views.CategoryView.as_view()),
+    # 商品列表
+    url(r'^categories/(?P<category_id>\d+)/skus/$', views.SKUListView.as_view()),
+    # 类别热销排行
+    url(r'^categories/(?P<category_id>\d+)/hotskus/$', views.HotSKUListView.as_view()),
+    # 商品规格选项与sku的对应关系
+    url(r'^goods/(?P<goods_id>\d+)/specs/$', views.GoodsSpecsView.as_view()),
+    # 搜索商品
+    url(r'^skus/search/$', views.SKUSearchView.as_view()),
+]
@@ -0,0 +1,344 @@
+from collections import OrderedDict, namedtuple
+from types import MappingProxyType
+from django.template import loader
+from django_redis import get_redis_connection
+from redis import RedisError, WatchError
+import hashlib
+import json
+import threading
+import time
+
+from .models import GoodsCategory, GoodsChannel, Goods, SpecificationOption, SKUSpecification
+from . import constants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+# 商品类别节点：sub_cats是子类别节点组成的元组
+CategoryNode = namedtuple('CategoryNode', ['id', 'name', 'parent_id', 'sub_cats'])
+
+# 商品频道：id和name是频道对应的一级类别
+ChannelNode = namedtuple('ChannelNode', ['id', 'name', 'url'])
+
+# 频道组：channels是组内的频道，sub_cats是组内所有频道的二级类别
+ChannelGroup = namedtuple('ChannelGroup', ['channels', 'sub_cats'])
+
+# 商品类别树
+CategoryTree = namedtuple('CategoryTree', ['nodes', 'roots', 'groups'])
+
+# 面包屑的一级：一级类别的url是频道链接，三级类别的url是列表页链接
+BreadcrumbItem = namedtuple('BreadcrumbItem', ['id', 'name', 'url'])
+
+# 面包屑：二级类别只有cat1、cat2，一级类别只有cat1，缺少的级别为None
+Breadcrumb = namedtuple('Breadcrumb', ['cat1', 'cat2', 'cat3'])
+
+# 进程内缓存的类别祖先关系
+# version: 加载时redis中的类别版本；checked_at: 上次检查版本的时间；ancestry: {类别id: Breadcrumb}
+_ancestry_cache = {'version': None, 'checked_at': 0, 'ancestry': None}
+_ancestry_lock = threading.Lock()
+
+# 渲染好的类别菜单：version是菜单内容的哈希，html是菜单片段，json是菜单数据的json字符串
+CategoryMenu = namedtuple('CategoryMenu', ['version', 'html', 'json'])
+
+
+def load_category_tree():
+    """
+    加载三级商品类别树
+    只执行两条查询（全部类别、全部频道），在内存中组装成不可变的结构，
+    主页、列表页、面包屑可以共用同一棵树
+    :return: CategoryTree
+        nodes: {类别id: CategoryNode}，只读字典，按id查找任意类别
+        roots: 一级类别节点组成的元组
+        groups: {组号: ChannelGroup}，按组号、组内顺序排好的只读有序字典，即商品频道及分类菜单
+    """
+    # 查询全部类别，记录每个类别的子类别
+    rows = GoodsCategory.objects.order_by('id').values_list('id', 'name', 'parent_id')
+    categories = OrderedDict()
+    children = {}
+    for cat_id, name, parent_id in rows:
+        categories[cat_id] = (name, parent_id)
+        children.setdefault(parent_id, []).append(cat_id)
+
+    # 自顶向下递归构建节点，子类别节点先于父类别节点生成
+    nodes = {}
+
+    def build(cat_id):
+        name, parent_id = categories[cat_id]
+        sub_cats = tuple(build(sub_id) for sub_id in children.get(cat_id, []))
+        node = CategoryNode(cat_id, name, parent_id, sub_cats)
+        nodes[cat_id] = node
+        return node
+
+    roots = tuple(build(cat_id) for cat_id in children.get(None, []))
+
+    # 查询全部频道，按组组装菜单
+    groups = OrderedDict()
+    channels = GoodsChannel.objects.order_by('group_id', 'sequence').values_list('group_id', 'category_id', 'url')
+    for group_id, category_id, url in channels:
+        cat1 = nodes.get(category_id)
+        if cat1 is None:
+            continue
+
+        if group_id not in groups:
+            groups[group_id] = {'channels': [], 'sub_cats': []}
+
+        groups[group_id]['channels'].append(ChannelNode(cat1.id, cat1.name, url))
+        groups[group_id]['sub_cats'].extend(cat1.sub_cats)
+
+    groups = OrderedDict(
+        (group_id, ChannelGroup(tuple(group['channels']), tuple(group['sub_cats'])))
+        for group_id, group in groups.items()
+    )
+
+    return CategoryTree(MappingProxyType(nodes), roots, MappingProxyType(groups))
+
+
+def build_category_ancestry(category_tree):
+    """
+    构建所有类别的面包屑：{类别id: Breadcrumb}
+    一级类别只有cat1，二级类别有cat1、cat2，三级类别三级都有
+    """
+    # 一级类别的链接是其所属频道的链接
+    channel_urls = {}
+    for group in category_tree.groups.values():
+        for channel in group.channels:
+            channel_urls[channel.id] = channel.url
+
+    ancestry = {}
+    for cat1 in category_tree.roots:
+        item1 = BreadcrumbItem(cat1.id, cat1.name, channel_urls.get(cat1.id, ''))
+        ancestry[cat1.id] = Breadcrumb(item1, None, None)
+        for cat2 in cat1.sub_cats:
+            item2 = BreadcrumbItem(cat2.id, cat2.name, '')
+            ancestry[cat2.id] = Breadcrumb(item1, item2, None)
+            for cat3 in cat2.sub_cats:
+                item3 = BreadcrumbItem(cat3.id, cat3.name, '/list.html?cat=%s' % cat3.id)
+                ancestry[cat3.id] = Breadcrumb(item1, item2, item3)
+
+    return MappingProxyType(ancestry)
+
+
+def get_category_ancestry():
+    """
+    获取进程内缓存的类别祖先关系
+    每隔CATEGORY_ANCESTRY_CHECK_INTERVAL秒检查一次redis中的类别版本，版本变化时才重新加载，
+    其余时间直接读取内存，不访问数据库和redis
+    :return: {类别id: Breadcrumb}
+    """
+    now = time.time()
+    if _ancestry_cache['ancestry'] is not None and now - _ancestry_cache['checked_at'] < constants.CATEGORY_ANCESTRY_CHECK_INTERVAL:
+        return _ancestry_cache['ancestry']
+
+    with _ancestry_lock:
+        # 等待锁期间其他线程可能已经完成检查
+        if _ancestry_cache['ancestry'] is not None and now - _ancestry_cache['checked_at'] < constants.CATEGORY_ANCESTRY_CHECK_INTERVAL:
+            return _ancestry_cache['ancestry']
+
+        try:
+            redis_conn = get_redis_connection('default')
+            version = redis_conn.get(constants.CATEGORY_VERSION_KEY)
+        except RedisError as e:
+            # redis不可用时沿用已加载的类别祖先关系
+            logger.error(e)
+            version = _ancestry_cache['version']
+
+        if _ancestry_cache['ancestry'] is None or version != _ancestry_cache['version']:
+            _ancestry_cache['ancestry'] = build_category_ancestry(load_category_tree())
+            _ancestry_cache['version'] = version
+
+        _ancestry_cache['checked_at'] = time.time()
+        return _ancestry_cache['ancestry']
+
+
+def get_breadcrumb(category_id):
+    """
+    获取类别的面包屑，O(1)读取进程内缓存
+    :return: Breadcrumb，类别不存在时返回None
+    """
+    return get_category_ancestry().get(category_id)
+
+
+def invalidate_category_ancestry():
+    """
+    频道、类别变化后增加类别版本，所有进程在下次检查时重新加载类别祖先关系
+    """
+    _ancestry_cache['checked_at'] = 0
+    try:
+        redis_conn = get_redis_connection('default')
+        redis_conn.incr(constants.CATEGORY_VERSION_KEY)
+    except RedisError as e:
+        logger.error(e)
+
+
+def build_category_menu(category_tree=None):
+    """
+    渲染商品频道及分类菜单，并以内容哈希为版本保存到redis
+    :param category_tree: 类别树，None时从数据库加载
+    :return: CategoryMenu
+    """
+    # 加载类别之前先读取类别版本，发布时版本已经变化说明读到的可能是旧数据，不发布为当前菜单，
+    # 否则在失效之后发布的旧菜单会一直留在redis中
+    try:
+        redis_conn = get_redis_connection('default')
+        category_version = redis_conn.get(constants.CATEGORY_VERSION_KEY)
+    except RedisError as e:
+        logger.error(e)
+        redis_conn = None
+
+    if category_tree is None:
+        category_tree = load_category_tree()
+
+    data = [
+        {
+            'channels': [channel._asdict() for channel in group.channels],
+            'sub_cats': [
+                {
+                    'id': cat2.id,
+                    'name': cat2.name,
+                    'sub_cats': [{'id': cat3.id, 'name': cat3.name} for cat3 in cat2.sub_cats]
+                }
+                for cat2 in group.sub_cats
+            ]
+        }
+        for group in category_tree.groups.values()
+    ]
+    json_text = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    # 版本是菜单内容的哈希：只有菜单内容真正变化时版本才会变化
+    version = hashlib.md5(json_text.encode()).hexdigest()
+    html = loader.render_to_string('category_menu.html', {'categories': category_tree.groups})
+
+    if redis_conn is not None:
+        try:
+            with redis_conn.pipeline() as pl:
+                pl.watch(constants.CATEGORY_VERSION_KEY)
+                if pl.get(constants.CATEGORY_VERSION_KEY) == category_version:
+                    pl.multi()
+                    pl.hmset(constants.CATEGORY_MENU_KEY % version, {'html': html, 'json': json_text})
+                    pl.expire(constants.CATEGORY_MENU_KEY % version, constants.CATEGORY_MENU_EXPIRES)
+                    pl.set(constants.CATEGORY_MENU_VERSION_KEY, version)
+                    pl.execute()
+        except WatchError:
+            # 发布过程中类别发生了变化，下次获取时重新渲染
+            pass
+        except RedisError as e:
+            # 缓存失败不影响页面生成
+            logger.error(e)
+
+    return CategoryMenu(version, html, json_text)
+
+
+def get_category_menu():
+    """
+    获取商品频道及分类菜单
+    优先读取redis中当前版本的菜单，没有时重新渲染，主页、列表页、详情页和接口共用
+    :return: CategoryMenu
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        version = redis_conn.get(constants.CATEGORY_MENU_VERSION_KEY)
+        if version is not None:
+            version = version.decode()
+            html, json_text = redis_conn.hmget(constants.CATEGORY_MENU_KEY % version, 'html', 'json')
+            if html is not None and json_text is not None:
+                return CategoryMenu(version, html.decode(), json_text.decode())
+    except RedisError as e:
+        logger.error(e)
+
+    return build_category_menu()
+
+
+def invalidate_category_menu():
+    """
+    频道、类别变化后使当前菜单版本失效，下次获取时重新渲染
+    需要在invalidate_category_ancestry()增加类别版本之后调用，此后开始的渲染才会发布
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        redis_conn.delete(constants.CATEGORY_MENU_VERSION_KEY)
+    except RedisError as e:
+        logger.error(e)
+
+
+def build_goods_specs(goods_id):
+    """
+    构建商品的规格选项与上架sku的对应关系，并保存到redis
+    :return: 对应关系的json字符串
+        {
+            'specs': [{'id':, 'name':, 'options': [{'id':, 'value':}, ...]}, ...],  # 按规格id、选项id排序
+            'skus': {'选项id,选项id,...': sku_id, ...}  # 选项id按specs中规格的顺序排列
+        }
+        商品不存在时返回None，不保存到redis，避免按不存在的id写入大量空数据
+    """
+    if not Goods.objects.filter(pk=goods_id).exists():
+        return None
+
+    specs = OrderedDict()
+    options = SpecificationOption.objects.filter(spec__goods_id=goods_id).select_related('spec').order_by('spec_id', 'id')
+    for option in options:
+        if option.spec_id not in specs:
+            specs[option.spec_id] = {'id': option.spec_id, 'name': option.spec.name, 'options': []}
+        specs[option.spec_id]['options'].append({'id': option.id, 'value': option.value})
+
+    # 每个上架sku的规格选项 {sku_id: {spec_id: option_id}}
+    sku_options = {}
+    rows = SKUSpecification.objects.filter(sku__goods_id=goods_id, sku__is_launched=True)
+    for sku_id, spec_id, option_id in rows.values_list('sku_id', 'spec_id', 'option_id'):
+        sku_options.setdefault(sku_id, {})[spec_id] = option_id
+
+    skus = {}
+    for sku_id, options in sorted(sku_options.items()):
+        # 规格不完整的sku无法通过选项切换到
+        if all(spec_id in options for spec_id in specs):
+            key = ','.join(str(options[spec_id]) for spec_id in specs)
+            skus[key] = sku_id
+
+    json_text = json.dumps({'specs': list(specs.values()), 'skus': skus}, ensure_ascii=False, separators=(',', ':'))
+
+    try:
+        redis_conn = get_redis_connection('default')
+        redis_conn.setex(constants.GOODS_SPECS_KEY % goods_id, constants.GOODS_SPECS_EXPIRES, json_text)
+    except RedisError as e:
+        logger.error(e)
+
+    return json_text
+
+
+def get_goods_specs_json(goods_id):
+    """
+    获取商品的规格选项与sku对应关系的json，详情页和接口共用
+    缓存命中时不查询数据库；没有缓存时才检查商品是否存在，商品不存在时返回None
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        json_text = redis_conn.get(constants.GOODS_SPECS_KEY % goods_id)
+        if json_text is not None:
+            return json_text.decode()
+    except RedisError as e:
+        logger.error(e)
+
+    return build_goods_specs(goods_id)
+
+
+def get_goods_specs(goods_id):
+    """
+    获取商品的规格选项与sku对应关系
+    商品已删除时没有规格选项和sku
+    """
+    json_text = get_goods_specs_json(goods_id)
+    if json_text is None:
+        return {'specs': [], 'skus': {}}
+    return json.loads(json_text)
+
+
+def invalidate_goods_specs(goods_id):
+    """
+    sku或规格变化后使商品的规格选项与sku对应关系失效
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        redis_conn.delete(constants.GOODS_SPECS_KEY % goods_id)
+    except RedisError as e:
+        logger.error(e)
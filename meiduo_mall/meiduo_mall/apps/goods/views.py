@@ -1,3 +1,132 @@
-from django.shortcuts import render
+from django.http import HttpResponse, Http404
+from rest_framework.views import APIView
+from rest_framework.generics import ListAPIView
+from rest_framework.response import Response
+from rest_framework import status
 
+from meiduo_mall.utils.pagination import KeysetPagination
+from .models import SKU
+from .utils import get_category_menu, get_breadcrumb, get_goods_specs_json
+from .rankings import get_hot_sku_ids
+from .search import search
+from . import serializers
 # Create your views here.
+
+
+# url(r'^categories/menu/$', views.CategoryMenuView.as_view()),
+class CategoryMenuView(APIView):
+    """
+    商品频道及分类菜单
+    """
+    def get(self, request):
+        """
+        直接返回缓存中已编码好的菜单json，菜单版本作为ETag，版本未变化时返回304
+        """
+        menu = get_category_menu()
+        etag = '"%s"' % menu.version
+
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponse(status=304)
+        else:
+            content = '{"version":"%s","categories":%s}' % (menu.version, menu.json)
+            response = HttpResponse(content, content_type='application/json')
+
+        response['ETag'] = etag
+        return response
+
+
+# url(r'^categories/(?P<pk>\d+)/$', views.CategoryView.as_view()),
+class CategoryView(APIView):
+    """
+    商品列表页面包屑导航
+    """
+    def get(self, request, pk):
+        breadcrumb = get_breadcrumb(int(pk))
+        if breadcrumb is None:
+            return Response({'message': '类别不存在'}, status=status.HTTP_404_NOT_FOUND)
+
+        data = {}
+        for level, item in zip(breadcrumb._fields, breadcrumb):
+            if item is not None:
+                data[level] = item._asdict()
+        return Response(data)
+
+
+# url(r'^categories/(?P<category_id>\d+)/skus/$', views.SKUListView.as_view()),
+class SKUListView(ListAPIView):
+    """
+    商品列表
+    ?ordering=-create_time|price|-sales&cursor=xx&page_size=xx
+    """
+    serializer_class = serializers.SKUSerializer
+
+    # 游标分页：深页面和第一页的代价相同
+    pagination_class = KeysetPagination
+
+    # 允许的排序，第一个为默认排序；每个排序字段在tb_sku上都有(category_id, is_launched, 字段, id)的联合索引
+    ordering = ('-create_time', 'create_time', 'price', '-price', '-sales', 'sales')
+
+    def get_queryset(self):
+        category_id = self.kwargs['category_id']
+        return SKU.objects.filter(category_id=category_id, is_launched=True)
+
+
+# url(r'^categories/(?P<category_id>\d+)/hotskus/$', views.HotSKUListView.as_view()),
+class HotSKUListView(ListAPIView):
+    """
+    类别热销排行
+    """
+    serializer_class = serializers.SKUSerializer
+    pagination_class = None
+
+    def get_queryset(self):
+        # 从redis排行中读取sku_id，只按主键查询这几个sku，保持排行顺序
+        sku_ids = get_hot_sku_ids(self.kwargs['category_id'])
+        skus = SKU.objects.filter(is_launched=True).in_bulk(sku_ids)
+        return [skus[sku_id] for sku_id in sku_ids if sku_id in skus]
+
+
+# url(r'^goods/(?P<goods_id>\d+)/specs/$', views.GoodsSpecsView.as_view()),
+class GoodsSpecsView(APIView):
+    """
+    商品的规格选项与sku的对应关系，用于详情页切换规格选项
+    """
+    def get(self, request, goods_id):
+        """
+        直接返回缓存中已编码好的json，商品不存在时返回404
+        """
+        json_text = get_goods_specs_json(goods_id)
+        if json_text is None:
+            raise Http404
+        return HttpResponse(json_text, content_type='application/json')
+
+
+# url(r'^skus/search/$', views.SKUSearchView.as_view()),
+class SKUSearchView(APIView):
+    """
+    搜索商品
+    ?q=xx&page=1&page_size=20
+    """
+    page_size = 20
+    max_page_size = 100
+
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            page = max(int(request.query_params.get('page', 1)), 1)
+            page_size = min(max(int(request.query_params.get('page_size', self.page_size)), 1), self.max_page_size)
+        except ValueError:
+            return Response({'message': '参数错误'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # 从本机倒排索引中查询排好序的sku_id，只按主键查询当前页的sku
+        count, sku_ids = search(query, offset=(page - 1) * page_size, limit=page_size)
+        skus = SKU.objects.filter(is_launched=True).in_bulk(sku_ids)
+        skus = [skus[sku_id] for sku_id in sku_ids if sku_id in skus]
+
+        serializer = serializers.SKUSerializer(skus, many=True)
+        return Response({
+            'count': count,
+            'page': page,
+            'page_size': page_size,
+            'results': serializer.data,
+        })
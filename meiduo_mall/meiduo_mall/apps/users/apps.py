@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        # 注册信号：用户名、手机号变化时同步布隆过滤器，用户变化时清除用户缓存
+        from . import signals
@@ -0,0 +1,146 @@
+from collections import OrderedDict
+from django.utils.translation import ugettext as _
+from django_redis import get_redis_connection
+from redis import RedisError, WatchError
+from rest_framework import exceptions
+from rest_framework_jwt.authentication import JSONWebTokenAuthentication
+import pickle
+import threading
+import time
+
+from .models import User
+from . import constants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+# 进程内的用户缓存：{用户id: (过期时间, pickle后的用户对象)}，按最近使用排序
+# 保存pickle后的bytes而不是用户对象，每个请求得到独立的对象，视图修改request.user不会影响其他请求
+_local_users = OrderedDict()
+_local_users_lock = threading.Lock()
+
+
+def _get_local_user(user_id):
+    with _local_users_lock:
+        item = _local_users.get(user_id)
+        if item is None:
+            return None
+        if item[0] < time.time():
+            del _local_users[user_id]
+            return None
+        _local_users.move_to_end(user_id)
+        return item[1]
+
+
+def _set_local_user(user_id, data):
+    with _local_users_lock:
+        _local_users[user_id] = (time.time() + constants.USER_LOCAL_CACHE_EXPIRES, data)
+        _local_users.move_to_end(user_id)
+        while len(_local_users) > constants.USER_LOCAL_CACHE_SIZE:
+            _local_users.popitem(last=False)
+
+
+def _load_user(user_id):
+    """
+    从redis或数据库加载用户
+    查询数据库之前读取用户缓存的代数，写入时代数没有变化才写入：
+    查询到旧数据之后用户被修改、缓存被清除，旧数据不会再写回缓存
+    :return: (pickle后的用户对象, 是否可以缓存)，用户不存在时返回(None, False)
+    """
+    cache_key = constants.USER_CACHE_KEY % user_id
+    generation_key = constants.USER_CACHE_GENERATION_KEY % user_id
+    try:
+        redis_conn = get_redis_connection('default')
+        pl = redis_conn.pipeline()
+        pl.get(cache_key)
+        pl.get(generation_key)
+        data, generation = pl.execute()
+    except RedisError as e:
+        logger.error(e)
+        redis_conn = None
+        data = None
+
+    if data is not None:
+        return data, True
+
+    try:
+        user = User.objects.get(id=user_id)
+    except User.DoesNotExist:
+        return None, False
+    data = pickle.dumps(user, pickle.HIGHEST_PROTOCOL)
+
+    if redis_conn is None:
+        return data, False
+    try:
+        with redis_conn.pipeline() as pl:
+            pl.watch(generation_key)
+            if pl.get(generation_key) != generation:
+                return data, False
+            pl.multi()
+            pl.setex(cache_key, constants.USER_CACHE_EXPIRES, data)
+            pl.execute()
+    except WatchError:
+        return data, False
+    except RedisError as e:
+        logger.error(e)
+        return data, False
+    return data, True
+
+
+def get_cached_user(user_id):
+    """
+    按id加载用户：先查进程内缓存，再查redis，最后查询数据库并写回缓存
+    缓存的用户可能不是最新数据，修改后保存时需要指定update_fields，不能覆盖其他字段
+    :return: 用户对象，用户不存在时返回None
+    """
+    data = _get_local_user(user_id)
+    if data is None:
+        data, cacheable = _load_user(user_id)
+        if data is None:
+            return None
+        if cacheable:
+            _set_local_user(user_id, data)
+
+    return pickle.loads(data)
+
+
+def invalidate_cached_user(user_id):
+    """
+    用户修改、删除后清除缓存，并增加缓存代数，正在查询数据库的请求不会把旧数据写回缓存
+    其他进程的进程内缓存在USER_LOCAL_CACHE_EXPIRES秒内过期
+    """
+    with _local_users_lock:
+        _local_users.pop(user_id, None)
+    generation_key = constants.USER_CACHE_GENERATION_KEY % user_id
+    try:
+        redis_conn = get_redis_connection('default')
+        pl = redis_conn.pipeline()
+        pl.incr(generation_key)
+        pl.expire(generation_key, constants.USER_CACHE_GENERATION_EXPIRES)
+        pl.delete(constants.USER_CACHE_KEY % user_id)
+        pl.execute()
+    except RedisError as e:
+        logger.error(e)
+
+
+class CachedJSONWebTokenAuthentication(JSONWebTokenAuthentication):
+    """
+    JWT认证，按载荷中的user_id从缓存加载用户，缓存命中时不查询数据库
+    """
+    def authenticate_credentials(self, payload):
+        user_id = payload.get('user_id')
+        if not user_id:
+            # 没有user_id的旧token按用户名查询
+            return super().authenticate_credentials(payload)
+
+        user = get_cached_user(user_id)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_('Invalid signature.'))
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(_('User account is disabled.'))
+
+        return user
@@ -0,0 +1,133 @@
+# 用户名、手机号的布隆过滤器
+# 注册页面每次输入都会检查用户名、手机号是否已存在，布隆过滤器判断一定不存在时直接返回，
+# 只有可能存在时才查询数据库；布隆过滤器不能删除，改名、删除用户后旧值只会造成误判，不影响正确性，
+# 每天凌晨的定时任务（CRONJOBS）全量重建时清除
+from django_redis import get_redis_connection
+from redis import RedisError
+import hashlib
+import uuid
+
+from .models import User
+from . import constants
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+# 布隆过滤器中的字段
+BLOOM_FIELDS = ('username', 'mobile')
+
+
+def get_bit_offsets(value):
+    """
+    双重哈希计算值在bitmap中的位置：第i个位置为 (h1 + i * h2) % 位数
+    h1、h2取md5的前后8个字节，h2取奇数保证各位置不重复
+    """
+    digest = hashlib.md5(value.encode()).digest()
+    h1 = int.from_bytes(digest[:8], 'big')
+    h2 = int.from_bytes(digest[8:], 'big') | 1
+    return [(h1 + i * h2) % constants.USER_BLOOM_FILTER_BITS for i in range(constants.USER_BLOOM_FILTER_HASHES)]
+
+
+def _add_user(pl, user, keys):
+    """
+    在管道中加入设置用户各字段的命令
+    :param user: 用户对象，或者(username, mobile)
+    :param keys: {字段名: bitmap的redis键}
+    """
+    values = user if isinstance(user, tuple) else (user.username, user.mobile)
+    for field, value in zip(BLOOM_FIELDS, values):
+        if not value:
+            continue
+        for offset in get_bit_offsets(value):
+            pl.setbit(keys[field], offset, 1)
+
+
+def add_user(user):
+    """
+    新用户、用户名或手机号修改后，把当前的值加入布隆过滤器
+    """
+    keys = {field: constants.USER_BLOOM_FILTER_KEY % field for field in BLOOM_FIELDS}
+    try:
+        redis_conn = get_redis_connection('default')
+        pl = redis_conn.pipeline(transaction=False)
+        _add_user(pl, user, keys)
+        pl.execute()
+    except RedisError as e:
+        # 漏加的值会被误判为不存在，注册时由数据库的唯一约束兜底，每天凌晨的定时全量重建修正
+        logger.error(e)
+
+
+def might_exist(field, value):
+    """
+    判断值是否可能已存在，一次管道往返
+    :return: False表示一定不存在；True表示可能存在，需要查询数据库；
+        布隆过滤器还没有构建或者redis不可用时返回True
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        pl = redis_conn.pipeline(transaction=False)
+        pl.exists(constants.USER_BLOOM_FILTER_READY_KEY)
+        key = constants.USER_BLOOM_FILTER_KEY % field
+        for offset in get_bit_offsets(value):
+            pl.getbit(key, offset)
+        ready, *bits = pl.execute()
+    except RedisError as e:
+        logger.error(e)
+        return True
+
+    return not ready or all(bits)
+
+
+def count_users(field, value):
+    """
+    指定用户名或手机号的用户数量，布隆过滤器判断一定不存在时不查询数据库
+    """
+    if not might_exist(field, value):
+        return 0
+    return User.objects.filter(**{field: value}).count()
+
+
+def rebuild_user_bloom_filter():
+    """
+    根据tb_users全量重建布隆过滤器，清除已改名、已删除用户的旧值
+    先写入临时键，写完后RENAME为正式键；重建期间新注册的用户在替换后补充加入
+    :return: 加入的用户数量
+    """
+    redis_conn = get_redis_connection('default')
+    suffix = uuid.uuid4().hex
+    tmp_keys = {field: '%s_%s' % (constants.USER_BLOOM_FILTER_KEY % field, suffix) for field in BLOOM_FIELDS}
+
+    max_id = User.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+    count = 0
+    pl = redis_conn.pipeline(transaction=False)
+    batch = 0
+    users = User.objects.filter(id__lte=max_id).values_list('username', 'mobile')
+    for user in users.iterator():
+        _add_user(pl, user, tmp_keys)
+        count += 1
+        batch += 1
+        if batch >= constants.USER_BLOOM_FILTER_REBUILD_BATCH_SIZE:
+            pl.execute()
+            batch = 0
+    pl.execute()
+
+    # 原子替换正式键，没有任何用户时临时键不存在，删除正式键即可
+    pl = redis_conn.pipeline()
+    for field, tmp_key in tmp_keys.items():
+        if count:
+            pl.rename(tmp_key, constants.USER_BLOOM_FILTER_KEY % field)
+        else:
+            pl.delete(constants.USER_BLOOM_FILTER_KEY % field)
+    pl.set(constants.USER_BLOOM_FILTER_READY_KEY, 1)
+    pl.execute()
+
+    # 重建期间新注册的用户只写入了旧的正式键，替换后补充
+    for user in User.objects.filter(id__gt=max_id).values_list('username', 'mobile').iterator():
+        add_user(user)
+        count += 1
+
+    return count
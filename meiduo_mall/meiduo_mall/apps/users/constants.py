@@ -2,4 +2,43 @@
 VERIFY_EMAIL_TOKEN_EXPIRES = 60 * 60 * 24
 
 # 用户最多地址数量
-USER_ADDRESS_COUNTS_LIMIT = 20
\ No newline at end of file
+USER_ADDRESS_COUNTS_LIMIT = 20
+
+# 用户浏览历史的redis键，list：最近浏览的sku_id在前
+USER_BROWSING_HISTORY_KEY = 'history_%s'
+
+# 用户浏览历史最多保存的sku数量
+USER_BROWSING_HISTORY_COUNTS_LIMIT = 5
+
+# 用户名、手机号布隆过滤器的redis键（bitmap），%s为字段名：username、mobile
+USER_BLOOM_FILTER_KEY = 'user_bloom_%s'
+
+# 布隆过滤器已全量构建的标记，没有构建之前查询全部回源数据库
+USER_BLOOM_FILTER_READY_KEY = 'user_bloom_ready'
+
+# 布隆过滤器的位数，2^24位占用2MB，100万用户、10个哈希函数时误判率约为0.05%
+USER_BLOOM_FILTER_BITS = 2 ** 24
+
+# 每个值设置的位数（哈希函数个数）
+USER_BLOOM_FILTER_HASHES = 10
+
+# 全量重建布隆过滤器时每次提交到redis的用户数量
+USER_BLOOM_FILTER_REBUILD_BATCH_SIZE = 1000
+
+# JWT认证加载的用户缓存的redis键，%s为用户id，值为pickle后的用户对象
+USER_CACHE_KEY = 'user_%s'
+
+# 用户缓存在redis中的有效期，单位：秒
+USER_CACHE_EXPIRES = 60 * 10
+
+# 用户缓存代数的redis键，%s为用户id，每次失效时自增；查询数据库前读取，写入缓存时代数已变化则放弃写入
+USER_CACHE_GENERATION_KEY = 'user_generation_%s'
+
+# 用户缓存代数的有效期，单位：秒，远大于一次查询数据库到写入缓存的时间，过期后重新计数不会误判
+USER_CACHE_GENERATION_EXPIRES = 60 * 60 * 24
+
+# 进程内用户缓存的有效期，单位：秒，其他进程修改用户后本进程最多在这段时间内使用旧数据
+USER_LOCAL_CACHE_EXPIRES = 5
+
+# 进程内最多缓存的用户数量
+USER_LOCAL_CACHE_SIZE = 1000
@@ -0,0 +1,12 @@
+import time
+
+from .bloom import rebuild_user_bloom_filter as rebuild
+
+
+def rebuild_user_bloom_filter():
+    """
+    定时全量重建用户名、手机号布隆过滤器
+    """
+    print('%s: rebuild_user_bloom_filter' % time.ctime())
+    count = rebuild()
+    print('%s: added %d users to bloom filter' % (time.ctime(), count))
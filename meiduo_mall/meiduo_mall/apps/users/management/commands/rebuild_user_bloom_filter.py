@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from users.bloom import rebuild_user_bloom_filter
+
+
+class Command(BaseCommand):
+    """
+    全量重建用户名、手机号布隆过滤器
+    python manage.py rebuild_user_bloom_filter
+    """
+    help = '全量重建用户名、手机号布隆过滤器'
+
+    def handle(self, *args, **options):
+        count = rebuild_user_bloom_filter()
+        self.stdout.write('added %d users to bloom filter' % count)
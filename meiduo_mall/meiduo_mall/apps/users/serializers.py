@@ -4,6 +4,7 @@ from django_redis import get_redis_connection
 from rest_framework_jwt.settings import api_settings
 
 from .models import User, Address
+from . import constants
 from celery_tasks.email.tasks import send_verify_email
 
 
@@ -38,6 +39,32 @@ class UserAddressSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class AddUserBrowsingHistorySerializer(serializers.Serializer):
+    """
+    添加用户浏览历史序列化器
+    不查询数据库校验sku是否存在，记录浏览历史只访问一次redis；
+    读取浏览历史时会过滤掉不存在的sku
+    """
+    sku_id = serializers.IntegerField(label='商品SKU编号', min_value=1)
+
+    def create(self, validated_data):
+        """
+        保存浏览历史：去重、插入到最前、截取固定长度，在一个管道中完成
+        """
+        user_id = self.context['request'].user.id
+        sku_id = validated_data['sku_id']
+        key = constants.USER_BROWSING_HISTORY_KEY % user_id
+
+        redis_conn = get_redis_connection('history')
+        pl = redis_conn.pipeline()
+        pl.lrem(key, 0, sku_id)
+        pl.lpush(key, sku_id)
+        pl.ltrim(key, 0, constants.USER_BROWSING_HISTORY_COUNTS_LIMIT - 1)
+        pl.execute()
+
+        return validated_data
+
+
 class AddressTitleSerializer(serializers.ModelSerializer):
     """
     地址标题
@@ -74,7 +101,8 @@ class EmailSerializer(serializers.ModelSerializer):
         # instance == user对象
 
         instance.email = validated_data.get('email')
-        instance.save()
+        # 登录用户来自缓存，可能不是最新数据，只保存修改的字段
+        instance.save(update_fields=['email'])
 
         # 在保存邮件事件中，响应保存邮件结果之前，异步发送邮件
 
@@ -0,0 +1,28 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import User
+from .bloom import add_user
+from .authentication import invalidate_cached_user
+
+
+@receiver(post_save, sender=User)
+def on_user_saved(sender, instance, created, update_fields=None, **kwargs):
+    """
+    新用户、用户名或手机号修改后加入布隆过滤器
+    不等事务提交：回滚后多出的值只会造成误判，提交后才加入则可能把已存在的值判断为不存在
+    登录只更新last_login，不需要处理
+    """
+    if not created and update_fields is not None and not {'username', 'mobile'} & set(update_fields):
+        return
+    add_user(instance)
+
+
+@receiver([post_save, post_delete], sender=User)
+def on_user_changed(sender, instance, **kwargs):
+    """
+    用户修改、删除后，在事务提交后清除JWT认证使用的用户缓存
+    """
+    user_id = instance.id
+    transaction.on_commit(lambda: invalidate_cached_user(user_id))
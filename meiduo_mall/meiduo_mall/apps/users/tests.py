@@ -1,3 +1,46 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
+
+from areas.models import Area
+from .models import User, Address
 
 # Create your tests here.
+
+
+class AddressListTestCase(TestCase):
+    """
+    用户地址列表
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='address_user', password='12345678', mobile='13800000000')
+        self.province = Area.objects.create(name='广东省')
+        self.city = Area.objects.create(name='广州市', parent=self.province)
+        self.district = Area.objects.create(name='天河区', parent=self.city)
+
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def create_addresses(self, count):
+        for index in range(count):
+            Address.objects.create(user=self.user, title='地址%s' % index, receiver='张三', province=self.province,
+                                   city=self.city, district=self.district, place='某某路%s号' % index,
+                                   mobile='13800000000')
+
+    def test_list_query_count_is_constant(self):
+        """
+        省市区名称和地址一起查询，查询次数不随地址数量增加
+        """
+        self.create_addresses(1)
+        with self.assertNumQueries(1):
+            response = self.client.get('/addresses/')
+        self.assertEqual(len(response.data['addresses']), 1)
+
+        self.create_addresses(9)
+        with self.assertNumQueries(1):
+            response = self.client.get('/addresses/')
+        self.assertEqual(len(response.data['addresses']), 10)
+
+        address = response.data['addresses'][0]
+        self.assertEqual(address['province'], '广东省')
+        self.assertEqual(address['city'], '广州市')
+        self.assertEqual(address['district'], '天河区')
@@ -1,5 +1,4 @@
 from django.conf.urls import url
-from rest_framework_jwt.views import obtain_jwt_token
 from rest_framework import routers
 
 from . import views
@@ -13,14 +12,17 @@ urlpatterns = [
     # 注册
     url(r'^users/$', views.UserView.as_view()),
     # JWT登录
-    # url(r'^authorizations/$', ObtainJSONWebToken.as_view()),
-    url(r'^authorizations/$', obtain_jwt_token),
+    # url(r'^authorizations/$', obtain_jwt_token),
+    # 登录成功后合并购物车
+    url(r'^authorizations/$', views.UserAuthorizeView.as_view()),
     # 用户基本信息
     url(r'^user/$', views.UserDetailView.as_view()),
     # 添加邮箱
     url(r'^email/$', views.EmailView.as_view()),
     # 验证邮箱
     url(r'^emails/verification/$', views.VerifyEmailView.as_view()),
+    # 用户浏览历史
+    url(r'^browse_histories/$', views.UserBrowsingHistoryView.as_view()),
 ]
 
 router = routers.DefaultRouter()
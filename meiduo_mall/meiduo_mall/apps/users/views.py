@@ -7,8 +7,14 @@ from rest_framework import status
 from rest_framework import mixins
 from rest_framework.viewsets import GenericViewSet
 from rest_framework.decorators import action
+from rest_framework_jwt.views import ObtainJSONWebToken
+from django_redis import get_redis_connection
 
+from carts.utils import merge_cart_cookie_to_redis
+from goods.models import SKU
+from goods.serializers import SKUSerializer
 from .models import User
+from .bloom import count_users
 from . import serializers
 from . import constants
 # Create your views here.
@@ -22,7 +28,8 @@ class AddressViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, GenericVi
     permissions = [IsAuthenticated]
 
     def get_queryset(self):
-        return self.request.user.addresses.filter(is_deleted=False)
+        # 一次查询出省市区名称，查询次数和地址数量无关
+        return self.request.user.addresses.filter(is_deleted=False).select_related('province', 'city', 'district')
 
     # GET /addresses/
     def list(self, request, *args, **kwargs):
@@ -72,7 +79,8 @@ class AddressViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, GenericVi
         """
         address = self.get_object()
         request.user.default_address = address
-        request.user.save()
+        # 登录用户来自缓存，可能不是最新数据，只保存修改的字段
+        request.user.save(update_fields=['default_address'])
         return Response({'message': 'OK'}, status=status.HTTP_200_OK)
 
     # put /addresses/pk/title/
@@ -89,6 +97,29 @@ class AddressViewSet(mixins.CreateModelMixin, mixins.UpdateModelMixin, GenericVi
         return Response(serializer.data)
 
 
+# url(r'^browse_histories/$', views.UserBrowsingHistoryView.as_view()),
+class UserBrowsingHistoryView(CreateAPIView):
+    """
+    用户浏览历史
+    """
+    serializer_class = serializers.AddUserBrowsingHistorySerializer
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        查询浏览历史，所有sku在一次查询中取出，按浏览顺序返回
+        """
+        redis_conn = get_redis_connection('history')
+        sku_ids = [int(sku_id) for sku_id in redis_conn.lrange(
+            constants.USER_BROWSING_HISTORY_KEY % request.user.id, 0, -1)]
+
+        skus = SKU.objects.filter(is_launched=True).in_bulk(sku_ids)
+        sku_list = [skus[sku_id] for sku_id in sku_ids if sku_id in skus]
+
+        serializer = SKUSerializer(sku_list, many=True)
+        return Response(serializer.data)
+
+
 class VerifyEmailView(APIView):
     """验证邮箱
     目的：获取用户的token,读取出token中的user信息，将user查询出来修改email_active字段的值为True
@@ -108,7 +139,7 @@ class VerifyEmailView(APIView):
 
         # 将user查询出来修改email_active字段的值为True
         user.email_active = True
-        user.save()
+        user.save(update_fields=['email_active'])
 
         # 响应修改结果：修改数据状态码成功是200
         return Response({'message':'OK'})
@@ -165,6 +196,29 @@ class UserView(CreateAPIView):
     # 指定序列化器
     serializer_class = serializers.CreateUserSerializer
 
+    def create(self, request, *args, **kwargs):
+        """
+        注册成功即登录，合并未登录时的购物车
+        """
+        response = super().create(request, *args, **kwargs)
+        return merge_cart_cookie_to_redis(request, response.data['id'], response)
+
+
+# url(r'^authorizations/$', views.UserAuthorizeView.as_view()),
+class UserAuthorizeView(ObtainJSONWebToken):
+    """
+    JWT登录
+    """
+    def post(self, request, *args, **kwargs):
+        """
+        登录成功后合并未登录时的购物车
+        登录成功的响应数据由jwt_response_payload_handler生成，其中包含user_id
+        """
+        response = super().post(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            merge_cart_cookie_to_redis(request, response.data['user_id'], response)
+        return response
+
 
 # url(r'^mobiles/(?P<mobile>1[3-9]\d{9})/count/$', views.MobileCountView.as_view()),
 class MobileCountView(APIView):
@@ -175,7 +229,8 @@ class MobileCountView(APIView):
         """
         获取指定手机号数量
         """
-        count = User.objects.filter(mobile=mobile).count()
+        # 布隆过滤器判断一定不存在时不查询数据库
+        count = count_users('mobile', mobile)
 
         data = {
             'mobile': mobile,
@@ -194,7 +249,8 @@ class UsernameCountView(APIView):
         """
         获取指定用户名数量
         """
-        count = User.objects.filter(username=username).count()
+        # 布隆过滤器判断一定不存在时不查询数据库
+        count = count_users('username', username)
 
         data = {
             'username': username,
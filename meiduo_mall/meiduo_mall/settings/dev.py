@@ -61,6 +61,7 @@ INSTALLED_APPS = [
     'areas.apps.AreasConfig', # 省市区
     'goods.apps.GoodsConfig', # 商品
     'contents.apps.ContentsConfig', # 主页广告
+    'carts.apps.CartsConfig', # 购物车
 ]
 
 MIDDLEWARE = [
@@ -132,6 +133,20 @@ CACHES = {
         "OPTIONS": {
             "CLIENT_CLASS": "django_redis.client.DefaultClient",
         }
+    },
+    "history": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://127.0.0.1/3",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        }
+    },
+    "cart": {
+        "BACKEND": "django_redis.cache.RedisCache",
+        "LOCATION": "redis://127.0.0.1/4",
+        "OPTIONS": {
+            "CLIENT_CLASS": "django_redis.client.DefaultClient",
+        }
     }
 }
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
@@ -227,7 +242,7 @@ REST_FRAMEWORK = {
 
     # 认证
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_jwt.authentication.JSONWebTokenAuthentication', # JWT认证，默认
+        'users.authentication.CachedJSONWebTokenAuthentication', # JWT认证，默认，从缓存加载用户
         'rest_framework.authentication.SessionAuthentication', # session认证机制
         'rest_framework.authentication.BasicAuthentication', # 基本的认证机制
     ),
@@ -291,8 +306,21 @@ REST_FRAMEWORK_EXTENSIONS = {
 # FastDFS
 FDFS_BASE_URL = 'http://192.168.37.131:8888/'
 FDFS_CLIENT_CONF = os.path.join(BASE_DIR, 'utils/fastdfs/client.conf')
+# 每个进程最多保留的空闲fdfs客户端数量
+FDFS_CLIENT_POOL_SIZE = 10
+# 空闲超过该时间的fdfs客户端不再复用，单位：秒
+FDFS_CLIENT_MAX_IDLE = 60
+# 不超过该大小的文件读入内存上传，更大的文件从本地文件流式上传，单位：字节
+FDFS_BUFFER_UPLOAD_MAX_SIZE = 2.5 * 1024 * 1024
 # 更改文件存储的默认的后端
 DEFAULT_FILE_STORAGE = 'meiduo_mall.utils.fastdfs.fdfs_storage.FastDFSStorage'
+# 本地替代存储LocalFastDFSStorage的文件保存目录，测试和压测时把DEFAULT_FILE_STORAGE改为
+# 'meiduo_mall.utils.fastdfs.local_storage.LocalFastDFSStorage'
+FDFS_LOCAL_STORAGE_ROOT = os.path.join(os.path.dirname(BASE_DIR), 'fdfs_storage')
+# 本地替代存储写入文件后是否fsync
+FDFS_LOCAL_STORAGE_FSYNC = False
+# 本地替代存储的文件访问地址，DEBUG时由django提供FDFS_LOCAL_STORAGE_ROOT目录下的文件
+FDFS_LOCAL_STORAGE_BASE_URL = 'http://api.meiduo.site:8000/fdfs/'
 
 # 富文本编辑器ckeditor配置
 CKEDITOR_CONFIGS = {
@@ -309,11 +337,17 @@ GENERATED_STATIC_HTML_FILES_DIR = os.path.join(os.path.dirname(os.path.dirname(B
 
 # print(GENERATED_STATIC_HTML_FILES_DIR)
 
+# sku全文检索索引文件
+SKU_SEARCH_INDEX_PATH = os.path.join(os.path.dirname(BASE_DIR), 'search_index/skus.sqlite3')
+
 
 # 定时任务
+# 主页静态文件不再定时生成，而是在频道、类别、广告数据变化时由contents.signals触发生成
 CRONJOBS = [
-    # 每5分钟执行一次生成主页静态文件
-    ('*/2 * * * *', 'contents.crons.generate_static_index_html', '>> /home/python/Desktop/meiduo_mall/meiduo_mall/logs/crontab.log')
+    # 每小时根据销量全量重建一次类别热销排行，修正增量更新的偏差
+    ('0 * * * *', 'goods.crons.rebuild_hot_sku_rankings', '>> /home/python/Desktop/meiduo_mall/meiduo_mall/logs/crontab.log'),
+    # 每天凌晨全量重建用户名、手机号布隆过滤器，补上漏加的值，清除已改名、已删除用户的旧值
+    ('0 4 * * *', 'users.crons.rebuild_user_bloom_filter', '>> /home/python/Desktop/meiduo_mall/meiduo_mall/logs/crontab.log'),
 ]
 
 # 解决crontab中文问题
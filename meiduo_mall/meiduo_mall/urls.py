@@ -13,8 +13,11 @@ Including another URLconf
     1. Import the include() function: from django.conf.urls import url, include
     2. Add a URL to urlpatterns:  url(r'^blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.conf.urls import url, include
 from django.contrib import admin
+from django.views.static import serve
+from urllib.parse import urlsplit
 
 urlpatterns = [
     url(r'^admin/', admin.site.urls),
@@ -30,6 +33,22 @@ urlpatterns = [
 
     # areas
     url(r'^', include('areas.urls')),
+
+    # goods
+    url(r'^', include('goods.urls')),
+
+    # contents
+    url(r'^', include('contents.urls')),
+
+    # carts
+    url(r'^', include('carts.urls')),
     # 富文本编辑器
     url(r'^ckeditor/', include('ckeditor_uploader.urls')),
 ]
+
+if settings.DEBUG:
+    # 本地替代存储LocalFastDFSStorage保存的文件
+    urlpatterns += [
+        url(r'^%s(?P<path>.*)$' % urlsplit(settings.FDFS_LOCAL_STORAGE_BASE_URL).path.lstrip('/'), serve,
+            {'document_root': settings.FDFS_LOCAL_STORAGE_ROOT}),
+    ]
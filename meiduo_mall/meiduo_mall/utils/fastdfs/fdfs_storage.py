@@ -1,6 +1,69 @@
+from contextlib import contextmanager
+from django.core.files.base import ContentFile
 from django.core.files.storage import Storage
-from fdfs_client.client import Fdfs_client
 from django.conf import settings
+from django_redis import get_redis_connection
+from redis import RedisError
+import hashlib
+import os
+import tempfile
+import uuid
+
+from .pool import get_client_pool
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+# fastdfs文件扩展名的最大长度
+FDFS_FILE_EXT_NAME_MAX_LEN = 6
+
+# 已上传文件的索引，redis hash：内容哈希 -> file_id
+FDFS_FILE_HASH_KEY = 'fdfs_files'
+
+
+def get_file_ext_name(name):
+    """
+    上传到fastdfs的文件扩展名，file_id会带上扩展名，nginx据此返回正确的Content-Type
+    """
+    ext = os.path.splitext(name)[1][1:].lower()
+    if not ext.isalnum() or len(ext) > FDFS_FILE_EXT_NAME_MAX_LEN:
+        return ''
+    return ext
+
+
+def get_file_hash(sha256, file_ext_name):
+    """
+    文件去重使用的哈希：内容的sha256加扩展名，内容相同、扩展名不同的文件file_id不同
+    """
+    return '%s.%s' % (sha256.hexdigest(), file_ext_name)
+
+
+def get_file_id_by_hash(file_hash):
+    """
+    查询内容相同的文件是否已经上传过
+    :return: file_id，没有上传过或者redis不可用时返回None
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        file_id = redis_conn.hget(FDFS_FILE_HASH_KEY, file_hash)
+    except RedisError as e:
+        logger.error(e)
+        return None
+    return file_id.decode() if file_id else None
+
+
+def save_file_hash(file_hash, file_id):
+    """
+    记录文件内容哈希和file_id的对应关系
+    """
+    try:
+        redis_conn = get_redis_connection('default')
+        redis_conn.hsetnx(FDFS_FILE_HASH_KEY, file_hash, file_id)
+    except RedisError as e:
+        logger.error(e)
 
 
 class FastDFSStorage(Storage):
@@ -12,23 +75,55 @@ class FastDFSStorage(Storage):
 
     def _open(self, name, mode='rb'):
         """打开文件时会自动调用的方法
-        因为这个类是实现存储，不涉及到文件的打开，所以这个方法用不到，但是，必须文档告诉我必须实现，所以pass
+        从fastdfs下载文件内容，例如生成图片缩略图时读取原图
         """
-        pass
+        with get_client_pool(self.client_conf).client() as client:
+            content = client.download_to_buffer(name)
+        return ContentFile(content, name=name)
 
     def _save(self, name, content):
         """
         文件要存储时会自动的调用的方法：借此机会将要存储的文件上传到fastdfs
+        内容相同的文件只上传一次，之后直接返回已有的file_id
         :param name: 要存储的文件的名字
         :param content: 要存储的文件对象，是File类型的对象，需要调用read()读取出里面的文件内容二进制
         :return: file_id
         """
-        # 创建fdfs客户端
-        # client = Fdfs_client('meiduo_mall/utils/fastdfs/client.conf')
-        client = Fdfs_client(self.client_conf)
+        file_ext_name = get_file_ext_name(name)
+
+        if content.size <= settings.FDFS_BUFFER_UPLOAD_MAX_SIZE:
+            # 小文件:upload_by_buffer()是使用文件的二进制上传的
+            file_buffer = content.read()
+            file_hash = get_file_hash(hashlib.sha256(file_buffer), file_ext_name)
+            file_id = get_file_id_by_hash(file_hash)
+            if file_id is not None:
+                return file_id
+            return self._upload(file_hash, lambda client: client.upload_by_buffer(file_buffer, file_ext_name))
+
+        # 大文件：先分块计算哈希，内容已上传过时直接返回，不写本地文件
+        sha256 = hashlib.sha256()
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        file_hash = get_file_hash(sha256, file_ext_name)
+        file_id = get_file_id_by_hash(file_hash)
+        if file_id is not None:
+            return file_id
 
-        # 调用上传的方法:upload_by_buffer()是使用文件的二进制上传的
-        ret = client.upload_by_buffer(content.read())
+        # 没有上传过时从本地文件流式上传，不把整个文件读入内存
+        with self._local_file(content, file_ext_name) as file_path:
+            return self._upload(file_hash, lambda client: client.upload_by_file(file_path))
+
+    def _upload(self, file_hash, upload):
+        """
+        上传文件，并记录内容哈希和file_id的对应关系
+        :param file_hash: 文件内容的哈希
+        :param upload: 上传函数，参数是fdfs客户端，返回上传结果
+        :return: file_id
+        """
+        # 从进程内的客户端池中取出fdfs客户端，复用tracker和storage连接
+        # client = Fdfs_client('meiduo_mall/utils/fastdfs/client.conf')
+        with get_client_pool(self.client_conf).client() as client:
+            ret = upload(client)
 
         # 判断文件上传是否成功
         if ret.get('Status') != 'Upload successed.':
@@ -36,14 +131,49 @@ class FastDFSStorage(Storage):
 
         # 如果上传成功就将file_id返回出去
         file_id = ret.get('Remote file_id')
+        save_file_hash(file_hash, file_id)
 
         # 本次return会将file_id自动的存储到ImageField字段对应的模型属性中，并自动的同步到数据库
         return file_id
 
+    @contextmanager
+    def _local_file(self, content, file_ext_name):
+        """
+        提供文件内容在本地磁盘上的路径，fastdfs根据路径的扩展名确定file_id的扩展名
+        fastdfs会把'x.upload.jpg'的扩展名识别为'upload.jpg'，所以文件名中只能有扩展名前的一个点；
+        django的上传临时文件名为'tmpxxxx.upload.jpg'，硬链接为扩展名正确的文件名，不复制内容；
+        其他文件分块复制到临时文件，内存占用只有一个分块
+        """
+        if hasattr(content, 'temporary_file_path'):
+            file_path = content.temporary_file_path()
+            link_name = 'fdfs_%s' % uuid.uuid4().hex
+            if file_ext_name:
+                link_name += '.' + file_ext_name
+            link_path = os.path.join(os.path.dirname(file_path), link_name)
+            try:
+                os.link(file_path, link_path)
+            except OSError as e:
+                # 文件系统不支持硬链接时复制
+                logger.error(e)
+            else:
+                try:
+                    yield link_path
+                finally:
+                    os.remove(link_path)
+                return
+
+        suffix = '.' + file_ext_name if file_ext_name else ''
+        with tempfile.NamedTemporaryFile(suffix=suffix, dir=settings.FILE_UPLOAD_TEMP_DIR) as temp_file:
+            for chunk in content.chunks():
+                temp_file.write(chunk)
+            temp_file.flush()
+            yield temp_file.name
+
     def exists(self, name):
         """告诉Django文件是否存在
         本次的文件的存储需要转存到fastdfs,不需要在本地存储，所以每次要存储某个文件时，都需要返回False
         返回False,是告诉Django本地没有的，那么Django才会去存储，才会去调用save()方法
+        文件名不能说明内容是否重复，重复内容在_save()中按内容哈希判断
         """
         return False
 
@@ -0,0 +1,99 @@
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.conf import settings
+import base64
+import hashlib
+import os
+import tempfile
+
+from .fdfs_storage import get_file_ext_name
+
+
+class LocalFastDFSStorage(Storage):
+    """
+    本地文件系统存储，接口和FastDFSStorage相同，用于测试和单机压测，不需要fastdfs服务器
+    文件按内容寻址：文件名由内容的sha256生成，格式和fastdfs的file_id相同，例如group1/M00/3F/A2/xxxx.jpg，
+    内容相同的文件只保存一份
+    """
+    group_name = 'group1'
+    store_path = 'M00'
+
+    def __init__(self, location=None, base_url=None, fsync=None):
+        self.location = location or settings.FDFS_LOCAL_STORAGE_ROOT
+        self.base_url = base_url or settings.FDFS_LOCAL_STORAGE_BASE_URL
+        self.fsync = settings.FDFS_LOCAL_STORAGE_FSYNC if fsync is None else fsync
+
+    def path(self, name):
+        return os.path.join(self.location, name)
+
+    def _open(self, name, mode='rb'):
+        return File(open(self.path(name), mode))
+
+    def _get_file_id(self, sha256, file_ext_name):
+        """
+        根据内容的sha256生成fastdfs格式的file_id
+        两级目录取哈希的前两个字节，文件名是哈希前20个字节的base64编码，和fastdfs的文件名一样是27个字符
+        """
+        digest = sha256.digest()
+        file_name = base64.urlsafe_b64encode(digest[:20]).decode().rstrip('=')
+        if file_ext_name:
+            file_name += '.' + file_ext_name
+        return '/'.join([self.group_name, self.store_path, '%02X' % digest[0], '%02X' % digest[1], file_name])
+
+    def _save(self, name, content):
+        """
+        分块写入临时文件并计算哈希，写完后重命名为内容地址；内容已存在时丢弃临时文件
+        :return: file_id
+        """
+        os.makedirs(self.location, exist_ok=True)
+        sha256 = hashlib.sha256()
+
+        fd, temp_path = tempfile.mkstemp(dir=self.location)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                for chunk in content.chunks():
+                    sha256.update(chunk)
+                    temp_file.write(chunk)
+                if self.fsync:
+                    temp_file.flush()
+                    os.fsync(temp_file.fileno())
+
+            file_id = self._get_file_id(sha256, get_file_ext_name(name))
+            file_path = self.path(file_id)
+            if os.path.exists(file_path):
+                os.remove(temp_path)
+            else:
+                os.makedirs(os.path.dirname(file_path), exist_ok=True)
+                os.chmod(temp_path, 0o644)
+                os.replace(temp_path, file_path)
+                if self.fsync:
+                    # 重命名写入目录项，同样需要落盘
+                    dir_fd = os.open(os.path.dirname(file_path), os.O_RDONLY)
+                    try:
+                        os.fsync(dir_fd)
+                    finally:
+                        os.close(dir_fd)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+        return file_id
+
+    def delete(self, name):
+        try:
+            os.remove(self.path(name))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, name):
+        """
+        和FastDFSStorage一样，文件名由内容决定，不会和已有文件冲突，总是返回False
+        """
+        return False
+
+    def size(self, name):
+        return os.path.getsize(self.path(name))
+
+    def url(self, name):
+        return self.base_url + name
@@ -0,0 +1,189 @@
+from contextlib import contextmanager
+from fdfs_client.client import Fdfs_client
+from fdfs_client.tracker_client import Tracker_client
+from fdfs_client.storage_client import Storage_client
+from fdfs_client.utils import split_remote_fileid
+from django.conf import settings
+import os
+import queue
+import socket
+import threading
+import time
+
+
+import logging
+# 日志记录器
+logger = logging.getLogger('django')
+
+
+def _is_connection_alive(conn):
+    """
+    检查空闲连接是否可用：非阻塞地窥探一个字节
+    对端已关闭时读到b''；空闲连接上不应该有未读数据，读到数据也视为不可用
+    """
+    sock = conn.get_sock()
+    if sock is None:
+        return True
+
+    timeout = sock.gettimeout()
+    try:
+        sock.setblocking(False)
+        data = sock.recv(1, socket.MSG_PEEK)
+    except (BlockingIOError, InterruptedError):
+        return True
+    except OSError:
+        return False
+    finally:
+        try:
+            sock.settimeout(timeout)
+        except OSError:
+            pass
+    return not data
+
+
+class FdfsClient(object):
+    """
+    可复用的fdfs客户端
+    Fdfs_client每次操作都新建Storage_client，storage连接用完即关闭；
+    这里保留Fdfs_client的tracker连接池，并按storage地址缓存Storage_client，tracker和storage的连接都可以复用
+    同一时间只能由一个线程使用，由FdfsClientPool保证
+    """
+    def __init__(self, client_conf):
+        self.client = Fdfs_client(client_conf)
+        self.timeout = self.client.timeout
+        self.storages = {}
+        self.last_used = time.time()
+
+    def _get_tracker(self):
+        return Tracker_client(self.client.tracker_pool)
+
+    def _get_storage(self, store_serv):
+        key = (store_serv.ip_addr, store_serv.port)
+        storage = self.storages.get(key)
+        if storage is None:
+            storage = Storage_client(store_serv.ip_addr, store_serv.port, self.timeout)
+            self.storages[key] = storage
+        return storage
+
+    def _pools(self):
+        return [self.client.tracker_pool] + [storage.pool for storage in self.storages.values()]
+
+    def check_connections(self):
+        """
+        健康检查：移除已被对端关闭的空闲连接，下次使用时重新建立
+        """
+        for pool in self._pools():
+            for conn in list(pool._conns_available):
+                if not _is_connection_alive(conn):
+                    pool.remove(conn)
+                    conn.disconnect()
+
+    def close(self):
+        """
+        关闭所有连接
+        """
+        for pool in self._pools():
+            try:
+                pool.destroy()
+            except Exception as e:
+                logger.error(e)
+        self.storages = {}
+
+    def upload_by_buffer(self, file_buffer, file_ext_name=None):
+        tracker = self._get_tracker()
+        store_serv = tracker.tracker_query_storage_stor_without_group()
+        return self._get_storage(store_serv).storage_upload_by_buffer(tracker, store_serv, file_buffer, file_ext_name)
+
+    def upload_by_file(self, filename):
+        """
+        上传本地文件，使用sendfile分块发送，文件扩展名取自filename
+        """
+        tracker = self._get_tracker()
+        store_serv = tracker.tracker_query_storage_stor_without_group()
+        return self._get_storage(store_serv).storage_upload_by_file(tracker, store_serv, filename)
+
+    def download_to_buffer(self, file_id):
+        """
+        下载文件内容
+        :return: 文件内容的bytes
+        """
+        group_name, remote_filename = split_remote_fileid(file_id.encode())
+        tracker = self._get_tracker()
+        store_serv = tracker.tracker_query_storage_fetch(group_name, remote_filename)
+        ret = self._get_storage(store_serv).storage_download_to_buffer(tracker, store_serv, None, 0, 0, remote_filename)
+        return ret['Content']
+
+
+class FdfsClientPool(object):
+    """
+    进程内线程安全的fdfs客户端池
+    后进先出，优先复用最近使用的客户端；取出时空闲过久的客户端直接丢弃，其余的做连接健康检查；
+    使用中出现异常的客户端可能处于协议中间状态，不再放回池中
+    """
+    def __init__(self, client_conf, max_size, max_idle):
+        self.client_conf = client_conf
+        self.max_idle = max_idle
+        self.pid = os.getpid()
+        self._clients = queue.LifoQueue(max_size)
+
+    def acquire(self):
+        now = time.time()
+        while True:
+            try:
+                client = self._clients.get_nowait()
+            except queue.Empty:
+                return FdfsClient(self.client_conf)
+
+            if now - client.last_used > self.max_idle:
+                client.close()
+                continue
+
+            client.check_connections()
+            return client
+
+    def release(self, client):
+        client.last_used = time.time()
+        try:
+            self._clients.put_nowait(client)
+        except queue.Full:
+            client.close()
+
+    def discard(self, client):
+        client.close()
+
+    @contextmanager
+    def client(self):
+        """
+        with pool.client() as client:
+            client.upload_by_buffer(...)
+        """
+        client = self.acquire()
+        try:
+            yield client
+        except Exception:
+            self.discard(client)
+            raise
+        else:
+            self.release(client)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_client_pool(client_conf=None):
+    """
+    获取配置文件对应的客户端池，每个进程每个配置文件一个
+    fork出的子进程不能使用父进程的连接，发现进程号变化时重新创建
+    """
+    client_conf = client_conf or settings.FDFS_CLIENT_CONF
+    pool = _pools.get(client_conf)
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+
+    with _pools_lock:
+        pool = _pools.get(client_conf)
+        if pool is None or pool.pid != os.getpid():
+            pool = FdfsClientPool(client_conf, settings.FDFS_CLIENT_POOL_SIZE, settings.FDFS_CLIENT_MAX_IDLE)
+            _pools[client_conf] = pool
+        return pool
@@ -0,0 +1,102 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+import json
+
+
+class KeysetPagination(BasePagination):
+    """
+    游标（keyset）分页
+    按(排序字段, id)排序，游标记录上一页最后一条数据的(排序字段值, id)，
+    下一页使用 排序字段 < 值 OR (排序字段 = 值 AND id < id) 的条件从索引中直接定位，
+    不使用OFFSET，翻到多深的页面代价都和第一页相同；需要(过滤字段..., 排序字段, id)的联合索引
+    """
+    page_size = 20
+    max_page_size = 100
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+
+    # 允许的排序字段，'-'前缀表示降序，第一个为默认排序
+    ordering = ('-create_time',)
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, request, view):
+        ordering = getattr(view, 'ordering', None) or self.ordering
+        value = request.query_params.get(self.ordering_query_param)
+        if value in ordering:
+            return value
+        return ordering[0]
+
+    def encode_cursor(self, value, pk):
+        data = json.dumps([value, pk], separators=(',', ':'))
+        return urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, request, queryset, field_name):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+
+        try:
+            data = urlsafe_b64decode((encoded + '=' * (-len(encoded) % 4)).encode())
+            value, pk = json.loads(data.decode())
+            field = queryset.model._meta.get_field(field_name)
+            return field.to_python(value), int(pk)
+        except Exception:
+            raise NotFound('无效的cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        ordering = self.get_ordering(request, view)
+        field_name = ordering.lstrip('-')
+        descending = ordering.startswith('-')
+
+        # id作为第二排序字段保证顺序唯一，方向与排序字段一致
+        queryset = queryset.order_by(ordering, '-id' if descending else 'id')
+
+        cursor = self.decode_cursor(request, queryset, field_name)
+        if cursor is not None:
+            value, pk = cursor
+            lookup = 'lt' if descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{'%s__%s' % (field_name, lookup): value}) |
+                Q(**{field_name: value, 'id__%s' % lookup: pk})
+            )
+
+        # 多取一条判断是否还有下一页
+        page_size = self.get_page_size(request)
+        results = list(queryset[:page_size + 1])
+
+        self.next_cursor = None
+        if len(results) > page_size:
+            results = results[:page_size]
+            last = results[-1]
+            value = getattr(last, field_name)
+            value = value.isoformat() if hasattr(value, 'isoformat') else str(value)
+            self.next_cursor = self.encode_cursor(value, last.id)
+
+        return results
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,75 @@
+import gzip
+import os
+import tempfile
+
+try:
+    import brotli
+except ImportError:
+    # brotli是可选依赖，未安装时只生成.gz文件
+    brotli = None
+
+
+# 生成的静态文件的权限：web服务器（nginx）需要能读取
+STATIC_FILE_MODE = 0o644
+
+# 预压缩文件的后缀，nginx的gzip_static、brotli_static直接读取这些文件
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+
+
+def _atomic_write(file_path, data, mtime=None):
+    """
+    原子写文件：先写到同目录下的临时文件，落盘后再rename覆盖目标文件
+    rename在同一文件系统内是原子的，读取者要么读到旧文件，要么读到完整的新文件
+    """
+    dir_name = os.path.dirname(file_path)
+    os.makedirs(dir_name, exist_ok=True)
+
+    fd, tmp_path = tempfile.mkstemp(dir=dir_name, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp创建的文件只有属主可读
+        os.chmod(tmp_path, STATIC_FILE_MODE)
+        if mtime is not None:
+            os.utime(tmp_path, (mtime, mtime))
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def publish_static_html(file_path, html_text, mtime=None):
+    """
+    发布生成的静态html文件，同时生成.gz（安装了brotli时还有.br）预压缩文件
+    先发布压缩文件再发布html，每个文件都是原子替换，web服务器不会读到写了一半的文件
+    :param file_path: html文件路径
+    :param html_text: html内容
+    :param mtime: 文件的修改时间戳，None表示当前时间
+    """
+    data = html_text.encode('utf-8')
+
+    _atomic_write(file_path + '.gz', gzip.compress(data, compresslevel=9), mtime)
+
+    if brotli is not None:
+        _atomic_write(file_path + '.br', brotli.compress(data, mode=brotli.MODE_TEXT), mtime)
+    elif os.path.exists(file_path + '.br'):
+        # 不能生成.br时删除旧的.br，避免web服务器返回过期内容
+        os.remove(file_path + '.br')
+
+    _atomic_write(file_path, data, mtime)
+
+
+def remove_static_html(file_path):
+    """
+    删除静态html文件及其预压缩文件
+    """
+    for path in (file_path,) + tuple(file_path + suffix for suffix in COMPRESSED_SUFFIXES):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
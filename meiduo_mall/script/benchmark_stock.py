@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+库存扣减压测：大量买家并发购买同一个sku，验证不超卖并统计吞吐量
+
+使用方法（在meiduo_mall目录下执行）：
+    python script/benchmark_stock.py --sku 1 --buyers 100 --stock 1000 --count 3
+
+每个买家线程使用独立的数据库连接，买家数量不能超过mysql的max_connections（默认151）减去已有连接，
+压测更多买家前需要先调大，例如：SET GLOBAL max_connections = 500;
+压测会临时修改sku的库存，结束后恢复原来的库存和销量
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "meiduo_mall.settings.dev")
+
+import django
+django.setup()
+
+from django.db import connection
+from django.db.models import F
+
+from goods.exceptions import StockNotEnoughException
+from goods.models import SKU, Goods
+from goods.stock import deduct_stock
+
+
+def buy(sku_id, count, barrier, results, lock):
+    """
+    一个买家：等所有买家就绪后同时下单
+    """
+    barrier.wait()
+    start = time.time()
+    try:
+        deduct_stock({sku_id: count})
+        status = 'ok'
+    except StockNotEnoughException:
+        status = 'not_enough'
+    except Exception as e:
+        status = 'error: %s' % e
+    finally:
+        # 每个线程使用独立的数据库连接，结束时关闭
+        connection.close()
+    with lock:
+        results.append((status, time.time() - start))
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def check_connections(buyers):
+    """
+    检查mysql剩余的连接数是否足够每个买家各用一个连接
+    :return: 是否足够
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SHOW VARIABLES LIKE 'max_connections'")
+        max_connections = int(cursor.fetchone()[1])
+        cursor.execute("SHOW STATUS LIKE 'Threads_connected'")
+        connected = int(cursor.fetchone()[1])
+
+    available = max_connections - connected
+    if buyers > available:
+        print('买家数量%s超过mysql可用的连接数%s（max_connections=%s，已有连接%s），'
+              '请减少--buyers或者调大max_connections' % (buyers, available, max_connections, connected))
+        return False
+    return True
+
+
+def run_round(sku, buyers, stock, count):
+    """
+    一轮压测
+    :return: 是否通过校验
+    """
+    SKU.objects.filter(id=sku.id).update(stock=stock)
+    sales_before = SKU.objects.get(id=sku.id).sales
+    goods_sales_before = Goods.objects.get(id=sku.goods_id).sales
+
+    barrier = threading.Barrier(buyers)
+    lock = threading.Lock()
+    results = []
+    threads = [threading.Thread(target=buy, args=(sku.id, count, barrier, results, lock)) for _ in range(buyers)]
+
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+
+    ok = sum(1 for status, _ in results if status == 'ok')
+    not_enough = sum(1 for status, _ in results if status == 'not_enough')
+    errors = [status for status, _ in results if status not in ('ok', 'not_enough')]
+    latencies = [latency for _, latency in results]
+
+    sku_after = SKU.objects.get(id=sku.id)
+    goods_sales_after = Goods.objects.get(id=sku.goods_id).sales
+
+    expected_ok = min(buyers, stock // count)
+    checks = [
+        ('库存不为负', sku_after.stock >= 0),
+        ('成功数量等于可售数量', ok == expected_ok),
+        ('剩余库存正确', sku_after.stock == stock - ok * count),
+        ('sku销量正确', sku_after.sales - sales_before == ok * count),
+        ('商品销量正确', goods_sales_after - goods_sales_before == ok * count),
+        ('没有其他错误', not errors),
+    ]
+
+    print('买家: %s 库存: %s 每单数量: %s' % (buyers, stock, count))
+    print('成功: %s 库存不足: %s 错误: %s' % (ok, not_enough, len(errors)))
+    print('耗时: %.3fs 吞吐量: %.1f单/s' % (elapsed, len(results) / elapsed if elapsed else 0))
+    print('延迟 p50: %.1fms p95: %.1fms p99: %.1fms' % (
+        percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000, percentile(latencies, 99) * 1000))
+    for error in errors[:5]:
+        print('  %s' % error)
+
+    passed = True
+    for name, result in checks:
+        print('  [%s] %s' % ('通过' if result else '失败', name))
+        passed = passed and result
+    return passed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='库存扣减压测')
+    parser.add_argument('--sku', type=int, required=True, help='压测的sku_id')
+    parser.add_argument('--buyers', type=int, default=100, help='并发买家数量，不能超过mysql的可用连接数')
+    parser.add_argument('--stock', type=int, default=500, help='压测前设置的库存')
+    parser.add_argument('--count', type=int, default=2, help='每个买家购买的数量')
+    parser.add_argument('--rounds', type=int, default=3, help='压测轮数')
+    args = parser.parse_args()
+
+    if not check_connections(args.buyers):
+        sys.exit(1)
+
+    sku = SKU.objects.get(id=args.sku)
+    passed = True
+    try:
+        for index in range(args.rounds):
+            print('第%s轮' % (index + 1))
+            passed = run_round(sku, args.buyers, args.stock, args.count) and passed
+            print()
+    finally:
+        # 恢复压测前的库存和销量
+        current = SKU.objects.get(id=sku.id)
+        sold = current.sales - sku.sales
+        SKU.objects.filter(id=sku.id).update(stock=sku.stock, sales=sku.sales)
+        Goods.objects.filter(id=sku.goods_id).update(sales=F('sales') - sold)
+
+    print('通过' if passed else '失败')
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
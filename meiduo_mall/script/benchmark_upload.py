@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+文件上传压测：多个线程通过文件存储后端并发上传，统计吞吐量和延迟
+
+使用方法（在meiduo_mall目录下执行）：
+    python script/benchmark_upload.py --files 1000 --size 102400 --threads 8
+    python script/benchmark_upload.py --storage meiduo_mall.utils.fastdfs.fdfs_storage.FastDFSStorage
+
+默认使用本地替代存储LocalFastDFSStorage，不需要fastdfs服务器；
+每个文件的内容都不同，--duplicate指定重复内容的比例，用于观察去重的效果
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "meiduo_mall.settings.dev")
+
+import django
+django.setup()
+
+from django.core.files.base import ContentFile
+from django.utils.module_loading import import_string
+
+
+def make_contents(files, size, duplicate):
+    """
+    生成上传的文件内容，按比例复用已生成的内容
+    """
+    contents = []
+    for index in range(files):
+        if contents and random.random() < duplicate:
+            contents.append(random.choice(contents))
+        else:
+            contents.append(os.urandom(size))
+    return contents
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    if not values:
+        return 0
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='文件上传压测')
+    parser.add_argument('--storage', default='meiduo_mall.utils.fastdfs.local_storage.LocalFastDFSStorage',
+                        help='文件存储后端')
+    parser.add_argument('--files', type=int, default=1000, help='上传的文件数量')
+    parser.add_argument('--size', type=int, default=100 * 1024, help='每个文件的大小，单位：字节')
+    parser.add_argument('--threads', type=int, default=8, help='并发线程数')
+    parser.add_argument('--duplicate', type=float, default=0, help='重复内容的比例，0到1')
+    parser.add_argument('--ext', default='jpg', help='文件扩展名')
+    args = parser.parse_args()
+
+    storage = import_string(args.storage)()
+    contents = make_contents(args.files, args.size, args.duplicate)
+
+    lock = threading.Lock()
+    latencies = []
+    file_ids = set()
+    errors = []
+
+    def worker(thread_index):
+        for index in range(thread_index, args.files, args.threads):
+            start = time.time()
+            try:
+                file_id = storage.save('bench.%s' % args.ext, ContentFile(contents[index]))
+            except Exception as e:
+                with lock:
+                    errors.append(e)
+                continue
+            with lock:
+                latencies.append(time.time() - start)
+                file_ids.add(file_id)
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(args.threads)]
+    start = time.time()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.time() - start
+
+    uploaded = len(latencies)
+    print('存储: %s' % args.storage)
+    print('文件: %s 大小: %s字节 线程: %s' % (args.files, args.size, args.threads))
+    print('成功: %s 失败: %s 不同的file_id: %s' % (uploaded, len(errors), len(file_ids)))
+    print('耗时: %.3fs 吞吐量: %.1f个/s %.2fMB/s' % (
+        elapsed, uploaded / elapsed if elapsed else 0, uploaded * args.size / 1024 / 1024 / elapsed if elapsed else 0))
+    print('延迟 p50: %.2fms p95: %.2fms p99: %.2fms' % (
+        percentile(latencies, 50) * 1000, percentile(latencies, 95) * 1000, percentile(latencies, 99) * 1000))
+    for error in errors[:5]:
+        print('  %s' % error)
+
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == '__main__':
+    main()